@@ -0,0 +1,324 @@
+# backend/app/api/cache.py
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode
+
+import anyio
+from starlette.concurrency import run_in_threadpool
+
+from app.api.compression import IDENTITY, accepted_encodings, compressed_variants
+from app.api.conditional import etag_for, not_modified, validator_headers
+from app.dataset import NO_VERSION, current_version
+
+# An in-process cache of finished API responses. The dashboard asks the same few questions
+# over and over (all states, a common year, a common cause), and the answers only change
+# when run_data.py loads new data, so we keep the response bodies and hand them straight
+# back the next time, without running the endpoint or touching the database.
+#
+# It sits in front of the whole API as ASGI middleware, which means it sees the bytes that
+# actually went out, and it works the same for every GET endpoint without them knowing.
+#
+# An entry's key is the route plus its normalized query string (see normalized_query).
+# Bodies are compressed once, when they're stored, and each hit gets the best encoding the
+# client accepts (see app/api/compression.py).
+# Entries are dropped when they're older than the TTL, when the dataset version changes,
+# or, least recently used first, when there are too many or they take up too much memory.
+
+CACHE_PREFIX = "/api/v1/"
+# Routes that shouldn't be cached: the cache's own stats, and lookups that go to other services.
+UNCACHED_PREFIXES = ("/api/v1/cache/", "/api/v1/geospatial/")
+
+CACHE_TTL = 600
+CACHE_MAX_ENTRIES = 512
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+# Anything bigger than this still gets sent, just not kept.
+CACHE_MAX_ENTRY_BYTES = 16 * 1024 * 1024
+
+# Every cached route can answer in more than one format and encoding.
+VARY = b"Accept, Accept-Encoding"
+
+# Filter values that all mean "no filter". The frontend already leaves these out, so
+# dropping them from the query string makes sure they all hit the same cache entry.
+EMPTY_FILTER_VALUES = {"All", "", "null", "None"}
+
+def normalized_query(query_string):
+    """The query string with the no-filter values dropped and the parameters in a fixed order."""
+    params = parse_qsl(query_string, keep_blank_values=True)
+    return urlencode(sorted((key, value) for key, value in params if value not in EMPTY_FILTER_VALUES))
+
+def header(headers, name):
+    return next((value for key, value in headers if key == name), None)
+
+class CachedResponse:
+    """One finished response: its status and headers, and its body in every encoding we keep."""
+
+    def __init__(self, status, headers, body, version, variants=None):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.version = version
+        self.created_at = time.monotonic()
+        self.hits = 0
+        # The headers for each encoding are worked out once, here, so a hit only has to pick
+        # one and hand the stored bytes over as they are.
+        self.representations = {IDENTITY: (headers, body)}
+        plain_headers = [(name, value) for name, value in headers if name != b"content-length"]
+        for encoding, compressed in (variants or {}).items():
+            self.representations[encoding] = (plain_headers + [
+                (b"content-encoding", encoding.encode("latin-1")),
+                (b"content-length", str(len(compressed)).encode("latin-1")),
+            ], compressed)
+
+    @classmethod
+    def compressed(cls, status, headers, body, version):
+        """A CachedResponse with every compressed encoding of the body that's worth keeping."""
+        # Something that's already encoded is kept as it is.
+        variants = compressed_variants(body) if header(headers, b"content-encoding") is None else {}
+        return cls(status, headers, body, version, variants)
+
+    def representation(self, encodings):
+        """The (encoding, headers, body) to send to a client that accepts `encodings`, best first."""
+        encoding = next((encoding for encoding in encodings if encoding in self.representations), IDENTITY)
+        return (encoding, *self.representations[encoding])
+
+    @property
+    def size(self):
+        return sum(
+            len(body) + sum(len(name) + len(value) for name, value in headers)
+            for headers, body in self.representations.values()
+        )
+
+class ResponseCache:
+    """A thread-safe LRU of CachedResponses, bounded by count and bytes, with a TTL."""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_sent = 0
+        self.bytes_saved = 0
+        self.sent_by_encoding = {}
+        self.version = None
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def check_version(self, version):
+        """Empties the cache if the dataset version moved on since the last request."""
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self._bytes = 0
+                self.version = version
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry.version != self.version or time.monotonic() - entry.created_at > self.ttl):
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            entry.hits += 1
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            if entry.version != self.version:
+                return  # Computed from data that's already been replaced.
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def record_send(self, entry, encoding):
+        """Counts one response sent from `entry`, and the bytes its encoding saved."""
+        sent = len(entry.representations[encoding][1])
+        with self._lock:
+            self.bytes_sent += sent
+            self.bytes_saved += len(entry.body) - sent
+            self.sent_by_encoding[encoding] = self.sent_by_encoding.get(encoding, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Counters, totals and one line per entry (most recently used last), for /cache/stats."""
+        with self._lock:
+            now = time.monotonic()
+            lookups = self.hits + self.misses
+            # How far each encoding shrinks the bodies it was kept for.
+            compression = {}
+            for entry in self._entries.values():
+                for encoding, (_, body) in entry.representations.items():
+                    if encoding != IDENTITY:
+                        totals = compression.setdefault(encoding, {"entries": 0, "original_bytes": 0, "compressed_bytes": 0})
+                        totals["entries"] += 1
+                        totals["original_bytes"] += len(entry.body)
+                        totals["compressed_bytes"] += len(body)
+            for totals in compression.values():
+                totals["ratio"] = totals["compressed_bytes"] / totals["original_bytes"]
+            return {
+                "dataset_version": self.version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entry_count": len(self._entries),
+                "total_bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "compression": compression,
+                "bytes_sent": self.bytes_sent,
+                "bytes_saved": self.bytes_saved,
+                "sent_by_encoding": dict(self.sent_by_encoding),
+                "entries": [
+                    {
+                        "key": key, "bytes": entry.size, "hits": entry.hits, "age_seconds": round(now - entry.created_at, 1),
+                        "encodings": {encoding: len(body) for encoding, (_, body) in entry.representations.items()},
+                    }
+                    for key, entry in self._entries.items()
+                ],
+            }
+
+response_cache = ResponseCache()
+
+def cache_key(scope):
+    # Some endpoints answer in a different format depending on the Accept header, so it's part of the key.
+    accept = next((value.decode("latin-1") for name, value in scope["headers"] if name == b"accept"), "")
+    query = scope["query_string"].decode("latin-1")
+    return f"{scope['path']}?{query}|{accept}"
+
+def cacheable(scope):
+    path = scope["path"]
+    return (
+        scope["type"] == "http" and scope["method"] == "GET"
+        and path.startswith(CACHE_PREFIX) and not path.startswith(UNCACHED_PREFIXES)
+    )
+
+class ResponseCacheMiddleware:
+    """
+    ASGI middleware that answers repeated GETs from response_cache, and conditional GETs
+    for them with a 304 (see app/api/conditional.py), before the request reaches an endpoint.
+    """
+
+    def __init__(self, app, cache=response_cache):
+        self.app = app
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        if not cacheable(scope):
+            await self.app(scope, receive, send)
+            return
+
+        # The endpoint gets the normalized query string too, so 'state=All' and no state
+        # at all are answered the same way, just like they're cached the same way.
+        scope = dict(scope, query_string=normalized_query(scope["query_string"].decode("latin-1")).encode("latin-1"))
+        # The version check can read the database, so it runs off the event loop.
+        version, loaded_at = await run_in_threadpool(current_version)
+        self.cache.check_version(version)
+        key = cache_key(scope)
+
+        # The encodings this client takes, best first. Each one is its own representation,
+        # with its own ETag.
+        encodings = accepted_encodings((header(scope["headers"], b"accept-encoding") or b"").decode("latin-1"))
+
+        async def respond(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                headers = list(message.get("headers", [])) + [(b"vary", VARY)]
+                if version != NO_VERSION:
+                    encoding = header(headers, b"content-encoding")
+                    encoding = encoding.decode("latin-1") if encoding is not None else IDENTITY
+                    headers += validator_headers(etag_for(version, key, encoding), loaded_at)
+                message = dict(message, headers=headers)
+            await send(message)
+
+        async def send_entry(entry):
+            encoding, headers, body = entry.representation(encodings)
+            self.cache.record_send(entry, encoding)
+            await respond({"type": "http.response.start", "status": entry.status, "headers": headers})
+            await respond({"type": "http.response.body", "body": body})
+
+        entry = self.cache.get(key)
+        if entry is not None:
+            # Only a request we've already answered with a 200 can be told it's not modified.
+            # Anything else (an unknown route, invalid parameters) goes to the endpoint first,
+            # so it gets its 404 or 422 whatever validators it sends. Until the ETL has written
+            # a version we can't tell when the data changes, so there are no validators at all.
+            if version != NO_VERSION:
+                kept = [encoding for encoding in encodings if encoding in entry.representations]
+                etag = not_modified(
+                    dict(scope["headers"]), [etag_for(version, key, encoding) for encoding in kept or [IDENTITY]], loaded_at
+                )
+                if etag is not None:
+                    await send({"type": "http.response.start", "status": 304,
+                                "headers": validator_headers(etag, loaded_at) + [(b"vary", VARY)]})
+                    await send({"type": "http.response.body", "body": b""})
+                    return
+            await send_entry(entry)
+            return
+
+        # The start of the response is held back until we've seen the body. If the whole body
+        # comes in one piece (the usual JSON response) it's compressed and cached first, and
+        # the client gets its best encoding straight away. A streamed body is passed through
+        # as it's produced, keeping a copy to cache if it turns out to be a complete 200 that
+        # isn't too big.
+        captured = {"start": None, "streamed_start": None, "chunks": [], "size": 0, "keep": True}
+
+        async def cache_body(start, body):
+            entry = await run_in_threadpool(
+                CachedResponse.compressed, start["status"], list(start.get("headers", [])), body, version
+            )
+            self.cache.put(key, entry)
+            return entry
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                captured["start"] = message
+                captured["keep"] = message["status"] == 200
+                return
+            if message["type"] != "http.response.body":
+                await respond(message)
+                return
+
+            start, captured["start"] = captured["start"], None
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None and not more_body and captured["keep"] and len(body) <= CACHE_MAX_ENTRY_BYTES:
+                await send_entry(await cache_body(start, body))
+                return
+
+            if start is not None:
+                captured["streamed_start"] = start
+                await respond(start)
+            if captured["keep"]:
+                captured["size"] += len(body)
+                if captured["size"] > CACHE_MAX_ENTRY_BYTES:
+                    captured["keep"], captured["chunks"] = False, []
+                else:
+                    captured["chunks"].append(body)
+            await respond(message)
+            if not more_body and captured["keep"]:
+                # The response is finished, so a streaming response may cancel us as soon as
+                # the client hangs up. The copy should still make it into the cache.
+                with anyio.CancelScope(shield=True):
+                    await cache_body(captured["streamed_start"], b"".join(captured["chunks"]))
+
+        await self.app(scope, receive, capture)
@@ -0,0 +1,138 @@
+# backend/app/api/clusters.py
+from datetime import date
+
+from sqlalchemy import func, or_, select, union_all
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+
+from app import grid
+from app.api.rollups import cell_rollup_ready
+from app.etl.rollups import CELL_ROLLUP_ZOOMS
+from app.models import db_models
+
+# The grouping behind /fires/clusters. At the coarse zooms most of it comes from
+# 'wildfire_cell_rollup', so a national view reads a few rows per visible cell (one per
+# state, cause and year in it) instead of grouping every fire in the country. The rollup
+# only knows whole FIRE_YEARs, so when the date range starts or ends part way through a
+# year, the fires of those (at most two) partial years are grouped from the raw table and
+# added on. Finer zooms, and a database without the rollup, use the raw table throughout.
+
+def full_years(start_date, end_date):
+    """
+    The first and last FIRE_YEAR the date filters take every fire of, None meaning no bound.
+    '<= end_date' takes only the midnight fires of end_date, so end_date's own year never counts.
+    """
+    first = None
+    if start_date:
+        first = start_date.year if start_date == date(start_date.year, 1, 1) else start_date.year + 1
+    last = end_date.year - 1 if end_date else None
+    return first, last
+
+def _rollup_part(zoom, cells, first, last, dated, state, cause):
+    rollup = db_models.CellRollup
+    query = select(
+        rollup.cell.label("cell"),
+        rollup.STAT_CAUSE_DESCR.label("cause"),
+        rollup.fire_count.label("fire_count"),
+        rollup.latitude_sum.label("latitude_sum"),
+        rollup.longitude_sum.label("longitude_sum"),
+        rollup.fire_size_sum.label("fire_size_sum"),
+    ).where(
+        rollup.zoom == zoom,
+        or_(*[rollup.cell.between(low, high) for low, high in grid.merged_ranges(cells, zoom, zoom)]),
+    )
+    if first is not None:
+        query = query.where(rollup.FIRE_YEAR >= first)
+    if last is not None:
+        query = query.where(rollup.FIRE_YEAR <= last)
+    if dated:
+        query = query.where(rollup.DATED.is_(True))
+    if state:
+        query = query.where(rollup.STATE == state)
+    if cause:
+        query = query.where(rollup.STAT_CAUSE_DESCR == cause)
+    return query
+
+def _filtered_fires(query, zoom, cells, start_date, end_date, state, cause):
+    # Imported here because the endpoints module imports this one.
+    from app.api.endpoints import apply_date_range_filter
+
+    fire = db_models.Wildfire
+    # The viewport becomes a handful of GRID_Z12 id ranges, so finding the fires inside it
+    # is an integer range scan on the grid index instead of comparing every lat/lon.
+    query = query.filter(or_(*[fire.GRID_Z12.between(low, high) for low, high in grid.merged_ranges(cells, zoom)]))
+    query = apply_date_range_filter(query, start_date, end_date)
+    if state:
+        query = query.filter(fire.STATE == state)
+    if cause:
+        query = query.filter(fire.STAT_CAUSE_DESCR == cause)
+    return query
+
+def _raw_part(db, zoom, cells, start_date, end_date, state, cause, years):
+    fire = db_models.Wildfire
+    cell = getattr(fire, grid.grid_column(zoom))
+    query = db.query(
+        cell.label("cell"),
+        fire.STAT_CAUSE_DESCR.label("cause"),
+        func.count(fire.FOD_ID).label("fire_count"),
+        func.sum(fire.LATITUDE).label("latitude_sum"),
+        func.sum(fire.LONGITUDE).label("longitude_sum"),
+        func.sum(fire.FIRE_SIZE).label("fire_size_sum"),
+    ).filter(fire.FIRE_YEAR.in_(sorted(years)))
+    query = _filtered_fires(query, zoom, cells, start_date, end_date, state, cause)
+    return query.group_by(cell, fire.STAT_CAUSE_DESCR).statement
+
+def _raw_clusters(db, zoom, cells, start_date, end_date, state, cause):
+    # With nothing from the rollup to add in, the raw table can be grouped by cell directly.
+    fire = db_models.Wildfire
+    query = db.query(
+        func.avg(fire.LATITUDE).label("lat"),
+        func.avg(fire.LONGITUDE).label("lon"),
+        func.count(fire.FOD_ID).label("count"),
+        func.coalesce(func.sum(fire.FIRE_SIZE), 0).label("total_acres"),
+        func.mode().within_group(fire.STAT_CAUSE_DESCR).label("dominant_cause")
+    )
+    query = _filtered_fires(query, zoom, cells, start_date, end_date, state, cause)
+    return query.group_by(getattr(fire, grid.grid_column(zoom))).all()
+
+def cluster_rows(db, zoom, cells, start_date=None, end_date=None, state=None, cause=None):
+    """
+    One row per grid cell at `zoom` among `cells` (sorted cell ids at that zoom) that has
+    matching fires, with the fires' centroid (lat, lon), count, total_acres and
+    dominant_cause, the most common cause (the first in code order on a tie, like mode()).
+    """
+    first, last = full_years(start_date, end_date)
+    if zoom not in CELL_ROLLUP_ZOOMS or not cell_rollup_ready(db) or (first is not None and last is not None and first > last):
+        return _raw_clusters(db, zoom, cells, start_date, end_date, state, cause)
+
+    parts = [_rollup_part(zoom, cells, first, last, bool(start_date or end_date), state, cause)]
+    # Whatever the date range takes from outside its whole years comes from the raw table:
+    # the start year when the range starts after January 1st, and the end date's year.
+    partial_years = set()
+    if start_date and start_date.year != first:
+        partial_years.add(start_date.year)
+    if end_date:
+        partial_years.add(end_date.year)
+    if partial_years:
+        parts.append(_raw_part(db, zoom, cells, start_date, end_date, state, cause, partial_years))
+
+    combined = (union_all(*parts) if len(parts) > 1 else parts[0]).subquery()
+    per_cause = select(
+        combined.c.cell,
+        combined.c.cause,
+        func.sum(combined.c.fire_count).label("fire_count"),
+        func.sum(combined.c.latitude_sum).label("latitude_sum"),
+        func.sum(combined.c.longitude_sum).label("longitude_sum"),
+        func.sum(combined.c.fire_size_sum).label("fire_size_sum"),
+    ).group_by(combined.c.cell, combined.c.cause).subquery()
+
+    fire_count = func.sum(per_cause.c.fire_count)
+    causes = func.array_agg(
+        aggregate_order_by(per_cause.c.cause, per_cause.c.fire_count.desc(), per_cause.c.cause)
+    ).filter(per_cause.c.cause.isnot(None))
+    return db.execute(select(
+        (func.sum(per_cause.c.latitude_sum) / fire_count).label("lat"),
+        (func.sum(per_cause.c.longitude_sum) / fire_count).label("lon"),
+        fire_count.label("count"),
+        func.coalesce(func.sum(per_cause.c.fire_size_sum), 0).label("total_acres"),
+        causes[1].label("dominant_cause"),
+    ).group_by(per_cause.c.cell)).all()
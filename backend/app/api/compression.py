@@ -0,0 +1,87 @@
+# backend/app/api/compression.py
+import gzip
+
+# Compression for cached responses. The big answers (a year of fires, the county
+# aggregates, the correlation sample) are JSON that shrinks 5-10x, but compressing them
+# on every request would spend the same CPU on the same bytes over and over. Instead the
+# response cache compresses a body once, when it's stored, and keeps every encoding next
+# to the original, so a hit only has to pick one (see app/api/cache.py).
+#
+# gzip is always there. brotli and zstd are used when their packages are installed.
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+IDENTITY = "identity"
+
+# Bodies smaller than this go out as they are. Compressing them saves next to nothing.
+MIN_COMPRESS_BYTES = 1024
+# A compressed copy is only kept if it's at most this fraction of the original,
+# which mostly leaves out the binary formats that are already dense.
+MAX_COMPRESSED_RATIO = 0.9
+
+# Each body is only compressed once, so these lean towards size over speed.
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 6
+ZSTD_LEVEL = 10
+
+# The encodings we can produce, best first. When a client accepts several equally,
+# this is the order we pick in.
+ENCODERS = {}
+if brotli is not None:
+    ENCODERS["br"] = lambda body: brotli.compress(body, quality=BROTLI_QUALITY)
+if zstandard is not None:
+    ENCODERS["zstd"] = lambda body: zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+ENCODERS["gzip"] = lambda body: gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+def compressed_variants(body):
+    """Every encoding of `body` that's worth keeping, as a dict of encoding -> bytes."""
+    if len(body) < MIN_COMPRESS_BYTES:
+        return {}
+    variants = {}
+    for encoding, compress in ENCODERS.items():
+        compressed = compress(body)
+        if len(compressed) <= len(body) * MAX_COMPRESSED_RATIO:
+            variants[encoding] = compressed
+    return variants
+
+def accepted_encodings(accept_encoding):
+    """
+    The encodings from an Accept-Encoding header that we can produce, most preferred first,
+    ending with identity unless the client ruled it out.
+    """
+    weights = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        weight = 1.0
+        params = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding] = weight
+
+    def weight_of(coding):
+        if coding in weights:
+            return weights[coding]
+        if coding == IDENTITY:
+            # identity is fine unless it's turned off explicitly, or by '*;q=0'.
+            return 0.0 if weights.get("*") == 0 else 0.001
+        return weights.get("*", 0.0)
+
+    preference = list(ENCODERS) + [IDENTITY]
+    candidates = [coding for coding in preference if weight_of(coding) > 0]
+    # sorted() is stable, so equal weights keep our own order. If the client ruled out
+    # everything, it gets the plain body anyway rather than an error.
+    return sorted(candidates, key=weight_of, reverse=True) or [IDENTITY]
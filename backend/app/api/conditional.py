@@ -0,0 +1,61 @@
+# backend/app/api/conditional.py
+import hashlib
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+# Conditional GETs. The API's answers only change when the dataset version does, so a
+# response can be identified by the version plus the request that produced it (route,
+# normalized query string and Accept header, i.e. the response cache's key) and the content
+# encoding it's sent in. That gives every response a strong ETag we can work out without
+# running the endpoint. Once a response is in the response cache, a client that already has
+# it gets a bodiless 304 without anything touching the database. Requests that have never
+# had a 200 always go to the endpoint, so they get its real answer (a 404, a 422, ...).
+
+# Browsers and proxies may reuse a response for this long without asking, then have to
+# check back. A reload shows up at most this many seconds late.
+CACHE_MAX_AGE = 60
+CACHE_CONTROL = f"public, max-age={CACHE_MAX_AGE}, must-revalidate"
+
+def etag_for(version, key, encoding="identity"):
+    """A strong ETag for the response to `key` under this dataset version, in this content encoding."""
+    # A gzipped body is a different set of bytes from the plain one, so it needs its own tag.
+    name = f"{version}|{key}" if encoding == "identity" else f"{version}|{key}|{encoding}"
+    return '"' + hashlib.sha256(name.encode()).hexdigest()[:32] + '"'
+
+def http_date(moment):
+    """Formats a naive UTC datetime for a Last-Modified header."""
+    return format_datetime(moment.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+def not_modified(headers, etags, loaded_at):
+    """
+    Checks the request's validators against the current ETags of the response, one per
+    encoding the client accepts, most preferred first. Returns the ETag to send back with a
+    304 if the client already has an up-to-date copy, or None if it needs the full response.
+    If-None-Match wins when both are sent, as the HTTP spec says.
+    """
+    if_none_match = headers.get(b"if-none-match")
+    if if_none_match is not None:
+        # If-None-Match uses the weak comparison, so a W/ prefix doesn't matter.
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.decode("latin-1").split(",")]
+        if "*" in tags:
+            return etags[0]
+        return next((etag for etag in etags if etag in tags), None)
+    if_modified_since = headers.get(b"if-modified-since")
+    if if_modified_since is not None and loaded_at is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since.decode("latin-1"))
+        except (TypeError, ValueError):
+            return None
+        if since.tzinfo is not None and loaded_at.replace(tzinfo=timezone.utc, microsecond=0) <= since:
+            return etags[0]
+    return None
+
+def validator_headers(etag, loaded_at):
+    """The ETag, Last-Modified and Cache-Control headers, as raw ASGI header pairs."""
+    headers = [
+        (b"etag", etag.encode("latin-1")),
+        (b"cache-control", CACHE_CONTROL.encode("latin-1")),
+    ]
+    if loaded_at is not None:
+        headers.append((b"last-modified", http_date(loaded_at).encode("latin-1")))
+    return headers
@@ -1,33 +1,50 @@
 # backend/app/api/endpoints.py
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import case, func, extract, or_
+from sqlalchemy import and_, case, desc, func, or_, true, tuple_
 from typing import List, Optional
 from datetime import date
-import pandas as pd
+import math
 import requests
 
 from app.database import get_db
+from app import grid
 from app.models import db_models, schemas
+from app.models.categories import decoded
 from app.ml import predictor
+from app.api.rollups import (
+    rollup_ready, apply_rollup_date_range_filter, rollup_date_range_conditions,
+    cumulative_totals_ready, cumulative_totals
+)
+from app.api.pagination import count_fires, decode_cursor, encode_cursor
+from app.api.streaming import ndjson_response, wants_ndjson
+from app.api.packed import packed_response, wants_packed
+from app.api.frames import frames_response
+from app.api.sampling import seeded_sample
+from app.sampling import MAX_SEED
+from app.api.timeseries import time_series
+from app.api.clusters import cluster_rows
+from app.api.topk import top_k_with_other
+from app.api.cache import response_cache
+from app.api.histograms import (
+    MAX_BINS, histogram_column, histogram_counts, linear_edges, log_edges, parse_edges, value_range
+)
 
 router = APIRouter()
 
-# A handy dictionary to map state abbreviations to their FIPS codes.
-STATE_TO_FIPS = {
-    'AL': '01', 'AK': '02', 'AZ': '04', 'AR': '05', 'CA': '06', 'CO': '08', 'CT': '09',
-    'DE': '10', 'FL': '12', 'GA': '13', 'HI': '15', 'ID': '16', 'IL': '17', 'IN': '18',
-    'IA': '19', 'KS': '20', 'KY': '21', 'LA': '22', 'ME': '23', 'MD': '24', 'MA': '25',
-    'MI': '26', 'MN': '27', 'MS': '28', 'MO': '29', 'MT': '30', 'NE': '31', 'NV': '32',
-    'NH': '33', 'NJ': '34', 'NM': '35', 'NY': '36', 'NC': '37', 'ND': '38', 'OH': '39',
-    'OK': '40', 'OR': '41', 'PA': '42', 'RI': '44', 'SC': '45', 'SD': '46', 'TN': '47',
-    'TX': '48', 'UT': '49', 'VT': '50', 'VA': '51', 'WA': '53', 'WV': '54', 'WI': '55', 'WY': '56'
-}
-
 # A reusable function to handle date filtering across different endpoints.
 def apply_date_range_filter(query, start_date, end_date):
     """Apply date range filter to the query"""
+    # The 'wildfires' table is partitioned by FIRE_YEAR, so we also bound FIRE_YEAR. That lets
+    # PostgreSQL skip every partition outside the range. The ETL files every dated fire under
+    # the year of its DISCOVERY_DATETIME, so the bounds are exact.
+    if start_date:
+        query = query.filter(db_models.Wildfire.FIRE_YEAR >= start_date.year)
+    if end_date:
+        query = query.filter(db_models.Wildfire.FIRE_YEAR <= end_date.year)
+
     if start_date and end_date:
         # If we have both a start and end date, we look for fires within that range.
         query = query.filter(
@@ -43,6 +60,60 @@ def apply_date_range_filter(query, start_date, end_date):
 
     return query
 
+# The columns a FirePoint needs, labelled with its field names and in the same order.
+# The map endpoints select just these instead of loading whole Wildfire objects, and send
+# the rows out as plain dicts, so no per-row ORM or Pydantic objects get built.
+FIRE_POINT_COLUMNS = [
+    db_models.Wildfire.FOD_ID.label("fod_id"),
+    db_models.Wildfire.LATITUDE.label("lat"),
+    db_models.Wildfire.LONGITUDE.label("lon"),
+    db_models.Wildfire.STAT_CAUSE_DESCR.label("cause"),
+    db_models.Wildfire.NWCG_REPORTING_AGENCY.label("agency"),
+    db_models.Wildfire.FIRE_SIZE.label("fire_size"),
+    db_models.Wildfire.FIRE_YEAR.label("fire_year"),
+    db_models.Wildfire.STATE.label("state"),
+    db_models.Wildfire.FIRE_NAME.label("fire_name"),
+    db_models.Wildfire.COUNTY.label("county"),
+    db_models.Wildfire.FIRE_SIZE_CLASS.label("fire_size_class"),
+]
+
+def fire_points_query(db):
+    """
+    A query for map points: only the FirePoint columns, and only fires that have a location
+    and a size. The map pages by (FIRE_SIZE, FOD_ID), which needs every fire to have a size.
+    """
+    return db.query(*FIRE_POINT_COLUMNS).filter(
+        db_models.Wildfire.LATITUDE.isnot(None),
+        db_models.Wildfire.LONGITUDE.isnot(None),
+        db_models.Wildfire.FIRE_SIZE.isnot(None)
+    )
+
+def grouped_counts(db, columns, start_date, end_date, state, not_null=None):
+    """
+    Fire counts grouped by the given columns, as a subquery with a 'count' column plus one
+    per entry in `columns` ({label: column name}, the name being one the rollup and the raw
+    table both have). Rows where any of the `not_null` columns (all of them by default)
+    are NULL are left out. Reads the rollup when it's ready.
+    """
+    if rollup_ready(db):
+        source = db_models.WildfireRollup
+        count = func.sum(source.fire_count)
+        date_filter = apply_rollup_date_range_filter
+    else:
+        source = db_models.Wildfire
+        count = func.count(source.FOD_ID)
+        date_filter = apply_date_range_filter
+
+    group_columns = [getattr(source, name) for name in columns.values()]
+    query = db.query(
+        *[column.label(label) for label, column in zip(columns, group_columns)],
+        count.label("count")
+    ).filter(*[getattr(source, name).isnot(None) for name in (columns.values() if not_null is None else not_null)])
+    query = date_filter(query, start_date, end_date)
+    if state:
+        query = query.filter(source.STATE == state)
+    return query.group_by(*group_columns).subquery()
+
 # Endpoint for the main map view, showing fires with pagination.
 @router.get("/fires", response_model=schemas.PaginatedFiresResponse)
 def get_paginated_fires(
@@ -52,9 +123,19 @@ def get_paginated_fires(
     state: Optional[str] = None,
     cause: Optional[str] = None,
     page: int = 1,
-    limit: int = 2000
+    limit: int = 2000,
+    cursor: Optional[str] = None,
+    output_format: Optional[str] = Query(None, alias="format"),
+    accept: Optional[str] = Header(None)
 ):
-    query = db.query(db_models.Wildfire)
+    """
+    Fires sorted from largest to smallest. Pass the `next_cursor` from one response as
+    `cursor` to get the page after it; that's much faster than `page` for deep pages.
+    With a cursor, `page` is ignored and comes back as null.
+    With ?format=packed (or Accept: application/x-fire-points) the fires come back in the
+    binary layout from app/api/packed.py, and the paging info moves into X-* headers.
+    """
+    query = fire_points_query(db)
     query = apply_date_range_filter(query, start_date, end_date)
 
     if state:
@@ -62,24 +143,118 @@ def get_paginated_fires(
     if cause and cause != 'All':
         query = query.filter(db_models.Wildfire.STAT_CAUSE_DESCR == cause)
 
-    total_fires = query.count()
-    offset = (page - 1) * limit
+    # The total comes from the rollup (or a cache), so it doesn't cost a full count on every page.
+    total_fires = count_fires(db, query, start_date, end_date, state, cause if cause != 'All' else None)
 
-    fires_page_db = query.order_by(db_models.Wildfire.FIRE_SIZE.desc()).offset(offset).limit(limit).all()
-
-    fires_response = [
-        schemas.FirePoint(
-            fod_id=f.FOD_ID, lat=f.LATITUDE, lon=f.LONGITUDE, cause=f.STAT_CAUSE_DESCR,
-            agency=f.NWCG_REPORTING_AGENCY, fire_size=f.FIRE_SIZE, fire_year=f.FIRE_YEAR,
-            state=f.STATE, fire_name=f.FIRE_NAME, county=f.COUNTY,
-            fire_size_class=f.FIRE_SIZE_CLASS # We also include the fire size class in the response.
+    # FOD_ID breaks ties between fires of the same size, so every fire has exactly one place in the order.
+    ordered = query.order_by(db_models.Wildfire.FIRE_SIZE.desc(), db_models.Wildfire.FOD_ID.desc())
+    if cursor:
+        # Keyset pagination: carry on right after the last fire of the previous page.
+        after_size, after_fod_id = decode_cursor(cursor)
+        ordered = ordered.filter(
+            tuple_(db_models.Wildfire.FIRE_SIZE, db_models.Wildfire.FOD_ID) < tuple_(after_size, after_fod_id)
         )
-        for f in fires_page_db if f.LATITUDE is not None and f.LONGITUDE is not None
-    ]
+    else:
+        ordered = ordered.offset((page - 1) * limit)
+    # A cursor page has no page number.
+    page_number = None if cursor else page
+
+    fires_page = ordered.limit(limit).all()
+
+    # A full page means there might be more, so we hand out a cursor for the next one.
+    next_cursor = None
+    if limit > 0 and len(fires_page) == limit:
+        last = fires_page[-1]
+        next_cursor = encode_cursor(last.fire_size, last.fod_id)
+
+    if wants_packed(accept, output_format):
+        headers = {"X-Total-Fires": str(total_fires), "X-Limit": str(limit)}
+        if page_number is not None:
+            headers["X-Page"] = str(page_number)
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+        return packed_response(fires_page, headers=headers)
+
+    # The rows already have the FirePoint field names, so they go out as they are.
+    return JSONResponse({
+        "total_fires": total_fires, "page": page_number, "limit": limit,
+        "fires": [row._asdict() for row in fires_page],
+        "next_cursor": next_cursor
+    })
+
+# How many zoom levels finer than the map the clustering grid is. Each map tile is 256px,
+# so 2 levels finer gives cells of about 64px on screen.
+CLUSTER_ZOOM_OFFSET = 2
+# A request covering more grid cells than this is refused, since it can't be a real viewport.
+MAX_VIEWPORT_CELLS = 4096
+# The most single fires one zoomed-in request can ask for.
+MAX_CLUSTER_FIRES = 10000
+
+# Endpoint for the clustered map, so it can show fire density at any zoom level.
+@router.get("/fires/clusters", response_model=schemas.FireClusterResponse)
+def get_fire_clusters(
+    bbox: str,
+    zoom: int,
+    db: Session = Depends(get_db),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    state: Optional[str] = None,
+    cause: Optional[str] = None,
+    limit: int = Query(2000, ge=1, le=MAX_CLUSTER_FIRES)
+):
+    """
+    Groups the fires inside a map viewport into clusters. `bbox` is 'west,south,east,north'
+    in degrees (Leaflet's bounds.toBBoxString()) and `zoom` is the map's zoom level.
+    Each cluster has its centroid, fire count, total acres and most common cause. Once the
+    map is zoomed in past the finest grid level, the fires come back one by one instead
+    (the `limit` largest of them).
+    """
+    try:
+        west, south, east, north = (float(value) for value in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be 'west,south,east,north'.")
+    if not (-90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180):
+        raise HTTPException(status_code=400, detail="bbox is outside the map.")
+
+    grid_zoom = max(grid.MIN_ZOOM, zoom + CLUSTER_ZOOM_OFFSET)
+    single_fires = grid_zoom > grid.MAX_ZOOM
+    cover_zoom = min(grid_zoom, grid.MAX_ZOOM)
+
+    cells = grid.cells_covering(south, west, north, east, cover_zoom)
+    if len(cells) > MAX_VIEWPORT_CELLS:
+        raise HTTPException(status_code=400, detail="The bbox is too big for this zoom level.")
+    cause = cause if cause != 'All' else None
+
+    if not single_fires:
+        # Mostly read from the per-cell rollup, see app/api/clusters.py.
+        clusters = [row._asdict() for row in cluster_rows(db, grid_zoom, cells, start_date, end_date, state, cause)]
+        return {"zoom": zoom, "grid_zoom": grid_zoom, "clusters": clusters}
+
+    # The viewport becomes a handful of GRID_Z12 id ranges, so finding the fires inside it
+    # is an integer range scan on the grid index instead of comparing every lat/lon.
+    in_viewport = or_(*[
+        db_models.Wildfire.GRID_Z12.between(first, last) for first, last in grid.merged_ranges(cells, cover_zoom)
+    ])
+    # The grid cells overhang the viewport a little, so single fires also get the exact box.
+    in_box_lon = (
+        db_models.Wildfire.LONGITUDE.between(west, east) if west <= east
+        else or_(db_models.Wildfire.LONGITUDE >= west, db_models.Wildfire.LONGITUDE <= east)
+    )
+    query = db.query(
+        db_models.Wildfire.LATITUDE.label("lat"),
+        db_models.Wildfire.LONGITUDE.label("lon"),
+        db_models.Wildfire.FIRE_SIZE.label("total_acres"),
+        db_models.Wildfire.STAT_CAUSE_DESCR.label("dominant_cause"),
+        db_models.Wildfire.FOD_ID.label("fod_id")
+    ).filter(in_viewport, db_models.Wildfire.LATITUDE.between(south, north), in_box_lon)
 
-    return {
-        "total_fires": total_fires, "page": page, "limit": limit, "fires": fires_response
-    }
+    query = apply_date_range_filter(query, start_date, end_date)
+    if state: query = query.filter(db_models.Wildfire.STATE == state)
+    if cause: query = query.filter(db_models.Wildfire.STAT_CAUSE_DESCR == cause)
+
+    fires = query.order_by(db_models.Wildfire.FIRE_SIZE.desc(), db_models.Wildfire.FOD_ID.desc()).limit(limit).all()
+    clusters = [{**row._asdict(), "count": 1} for row in fires]
+    return {"zoom": zoom, "grid_zoom": None, "clusters": clusters}
 
 # --- Endpoints for analyzing fire data over time ---
 
@@ -92,6 +267,25 @@ def get_filtered_diurnal_data(
     state: Optional[str] = None,
     cause: Optional[str] = None
 ):
+    if rollup_ready(db):
+        # Served from the pre-aggregated rollup instead of scanning every fire.
+        rollup = db_models.WildfireRollup
+        query = db.query(
+            rollup.DISCOVERY_HOUR.label("hour"),
+            func.sum(rollup.fire_count).label("fire_count"),
+            (func.sum(rollup.fire_size_sum) / func.nullif(func.sum(rollup.fire_size_count), 0)).label("avg_size")
+        ).filter(rollup.DISCOVERY_HOUR.isnot(None))
+
+        query = apply_rollup_date_range_filter(query, start_date, end_date)
+        if state: query = query.filter(rollup.STATE == state)
+        if cause and cause != 'All': query = query.filter(rollup.STAT_CAUSE_DESCR == cause)
+
+        results = query.group_by("hour").order_by("hour").all()
+        return [
+            schemas.DiurnalDataPoint(hour=e.hour, fire_count=e.fire_count, avg_size=round(e.avg_size, 2) if e.avg_size else 0)
+            for e in results
+        ]
+
     query = db.query(
         db_models.Wildfire.DISCOVERY_HOUR.label("hour"),
         func.count(db_models.Wildfire.FOD_ID).label("fire_count"),
@@ -114,53 +308,16 @@ def get_weekly_cadence(
     db: Session = Depends(get_db),
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-    state: Optional[str] = None
+    state: Optional[str] = None,
+    top_k: int = Query(5, ge=0)
 ):
-    base_query = db.query(db_models.Wildfire)
-    base_query = apply_date_range_filter(base_query, start_date, end_date)
-    if state: base_query = base_query.filter(db_models.Wildfire.STATE == state)
-
-    daily_cause_counts = base_query.with_entities(
-        db_models.Wildfire.DISCOVERY_DAY_OF_WEEK,
-        db_models.Wildfire.STAT_CAUSE_DESCR,
-        func.count(db_models.Wildfire.FOD_ID).label("fire_count")
-    ).filter(
-        db_models.Wildfire.DISCOVERY_DAY_OF_WEEK.isnot(None),
-        db_models.Wildfire.STAT_CAUSE_DESCR.isnot(None)
-    ).group_by(
-        db_models.Wildfire.DISCOVERY_DAY_OF_WEEK,
-        db_models.Wildfire.STAT_CAUSE_DESCR
-    ).subquery('daily_cause_counts')
-
-    ranked_causes = db.query(
-        daily_cause_counts.c.DISCOVERY_DAY_OF_WEEK,
-        daily_cause_counts.c.STAT_CAUSE_DESCR,
-        daily_cause_counts.c.fire_count,
-        func.row_number().over(
-            partition_by=daily_cause_counts.c.DISCOVERY_DAY_OF_WEEK,
-            order_by=daily_cause_counts.c.fire_count.desc()
-        ).label('rn')
-    ).subquery('ranked_causes')
-
-    final_cause_label = case(
-        (ranked_causes.c.rn <= 5, ranked_causes.c.STAT_CAUSE_DESCR),
-        else_='Other'
-    ).label('cause')
-
-    final_query = db.query(
-        ranked_causes.c.DISCOVERY_DAY_OF_WEEK.label("day_of_week"),
-        final_cause_label,
-        func.sum(ranked_causes.c.fire_count).label("count")
-    ).group_by(
-        "day_of_week",
-        "cause"
-    ).order_by(
-        "day_of_week",
-        func.sum(ranked_causes.c.fire_count).desc()
+    # The top causes on each day of the week, with the rest summed up as 'Other'.
+    counts = grouped_counts(
+        db, {"partition": "DISCOVERY_DAY_OF_WEEK", "category": "STAT_CAUSE_DESCR"},
+        start_date, end_date, state
     )
-
-    results = final_query.all()
-    return results
+    results = top_k_with_other(db, counts, top_k).order_by("partition", desc("count")).all()
+    return [{"day_of_week": row.partition, "cause": row.category, "count": row.count} for row in results]
 
 # Provides a summarized weekly view, grouping causes into broader categories.
 @router.get("/temporal/weekly-summary", response_model=List[schemas.WeeklyCadence])
@@ -170,21 +327,31 @@ def get_weekly_summary(
     end_date: Optional[date] = None,
     state: Optional[str] = None
 ):
-    cause_category = case(
-        (db_models.Wildfire.STAT_CAUSE_DESCR == 'Lightning', 'Lightning'),
-        (db_models.Wildfire.STAT_CAUSE_DESCR.in_(['Miscellaneous', 'Missing/Undefined']), 'Miscellaneous/Undefined'),
-        (db_models.Wildfire.STAT_CAUSE_DESCR.in_(['Debris Burning', 'Arson', 'Children', 'Fireworks', 'Smoking', 'Equipment Use']), 'Direct-Human'),
-        (db_models.Wildfire.STAT_CAUSE_DESCR.in_(['Powerline', 'Structure', 'Railroad', 'Campfire']), 'Indirect-Human'),
-        else_='Other'
-    ).label('cause')
+    if rollup_ready(db):
+        # Served from the pre-aggregated rollup instead of scanning every fire.
+        rollup = db_models.WildfireRollup
+        query = db.query(
+            rollup.DISCOVERY_DAY_OF_WEEK.label("day_of_week"),
+            rollup.CAUSE_CATEGORY.label("cause"),
+            func.sum(rollup.fire_count).label("count")
+        ).filter(
+            rollup.DISCOVERY_DAY_OF_WEEK.isnot(None),
+            rollup.CAUSE_CATEGORY.isnot(None)
+        )
 
+        query = apply_rollup_date_range_filter(query, start_date, end_date)
+        if state: query = query.filter(rollup.STATE == state)
+
+        return query.group_by("day_of_week", "cause").order_by("day_of_week", "cause").all()
+
+    # The ETL already sorted every cause into its broader category (see app/features.py).
     query = db.query(
         db_models.Wildfire.DISCOVERY_DAY_OF_WEEK.label("day_of_week"),
-        cause_category,
+        db_models.Wildfire.CAUSE_CATEGORY.label("cause"),
         func.count(db_models.Wildfire.FOD_ID).label("count")
     ).filter(
         db_models.Wildfire.DISCOVERY_DAY_OF_WEEK.isnot(None),
-        db_models.Wildfire.STAT_CAUSE_DESCR.isnot(None)
+        db_models.Wildfire.CAUSE_CATEGORY.isnot(None)
     )
 
     query = apply_date_range_filter(query, start_date, end_date)
@@ -208,74 +375,78 @@ def get_detailed_agency_performance(
     end_date: Optional[date] = None,
     state: Optional[str] = None,
     cause: Optional[str] = None,
-    limit: Optional[int] = 10
+    limit: Optional[int] = 10,
+    top_causes_k: int = Query(3, ge=0)
 ):
     """
-    Returns detailed performance metrics for the top N agencies, including a
-    breakdown of the top 3 causes for each agency.
+    Returns detailed performance metrics for the top N agencies (all of them if limit
+    is 0), including a breakdown of the top `top_causes_k` causes for each agency.
     """
-    # First, build the main query with all the user's filters.
-    base_query = db.query(db_models.Wildfire)
-    base_query = apply_date_range_filter(base_query, start_date, end_date)
+    fire = db_models.Wildfire
+
+    # Everything comes out of one scan: we count the fires per (agency, cause) pair, and
+    # window functions over those pairs give each agency's totals and rank its causes.
+    pairs = db.query(
+        fire.NWCG_REPORTING_AGENCY.label("agency"),
+        fire.STAT_CAUSE_DESCR.label("cause"),
+        func.count(fire.FOD_ID).label("fire_count"),
+        func.sum(fire.FIRE_SIZE).label("size_sum"),
+        func.count(fire.FIRE_SIZE).label("size_count"),
+        func.sum(fire.FIRE_DURATION_DAYS).label("duration_sum"),
+        func.count(fire.FIRE_DURATION_DAYS).label("duration_count"),
+        func.count(case((fire.COMPLEX_NAME.isnot(None), 1))).label("complex_count")
+    ).filter(fire.NWCG_REPORTING_AGENCY.isnot(None))
+    pairs = apply_date_range_filter(pairs, start_date, end_date)
     if state:
-        base_query = base_query.filter(db_models.Wildfire.STATE == state)
+        pairs = pairs.filter(fire.STATE == state)
     if cause and cause != 'All':
-        base_query = base_query.filter(db_models.Wildfire.STAT_CAUSE_DESCR == cause)
-
-    # Next, get the summary stats for the top N agencies based on the filtered data.
-    agency_stats_query = base_query.with_entities(
-        db_models.Wildfire.NWCG_REPORTING_AGENCY.label("agency_name"),
-        func.count(db_models.Wildfire.FOD_ID).label("fire_count"),
-        func.avg(db_models.Wildfire.FIRE_SIZE).label("avg_fire_size"),
-        func.avg(db_models.Wildfire.FIRE_DURATION_DAYS).label("avg_duration"),
-        func.count(case((db_models.Wildfire.COMPLEX_NAME.isnot(None), 1))).label("complex_fire_count")
-    ).filter(
-        db_models.Wildfire.NWCG_REPORTING_AGENCY.isnot(None)
-    ).group_by(
-        db_models.Wildfire.NWCG_REPORTING_AGENCY
-    ).order_by(
-        func.count(db_models.Wildfire.FOD_ID).desc()
-    )
-
+        pairs = pairs.filter(fire.STAT_CAUSE_DESCR == cause)
+    pairs = pairs.group_by(fire.NWCG_REPORTING_AGENCY, fire.STAT_CAUSE_DESCR).subquery()
+
+    by_agency = {"partition_by": pairs.c.agency}
+    agency_count = func.sum(pairs.c.fire_count).over(**by_agency)
+    ranked = db.query(
+        pairs.c.agency,
+        pairs.c.cause,
+        pairs.c.fire_count.label("cause_count"),
+        agency_count.label("fire_count"),
+        (func.sum(pairs.c.size_sum).over(**by_agency) / func.nullif(func.sum(pairs.c.size_count).over(**by_agency), 0)).label("avg_fire_size"),
+        (func.sum(pairs.c.duration_sum).over(**by_agency) / func.nullif(func.sum(pairs.c.duration_count).over(**by_agency), 0)).label("avg_duration"),
+        func.sum(pairs.c.complex_count).over(**by_agency).label("complex_fire_count"),
+        # Fires without a cause still count towards the agency, but never make its top causes.
+        func.row_number().over(
+            partition_by=pairs.c.agency,
+            order_by=[pairs.c.cause.is_(None), pairs.c.fire_count.desc(), pairs.c.cause]
+        ).label("cause_rank")
+    ).subquery()
+
+    agencies = db.query(
+        ranked,
+        func.dense_rank().over(order_by=[ranked.c.fire_count.desc(), ranked.c.agency]).label("agency_rank")
+    ).subquery()
+
+    # Every agency keeps at least its first row, so it still shows up with top_causes_k=0.
+    query = db.query(agencies).filter(agencies.c.cause_rank <= max(top_causes_k, 1))
     if limit and limit > 0:
-        agency_stats_query = agency_stats_query.limit(limit)
+        query = query.filter(agencies.c.agency_rank <= limit)
+    rows = query.order_by(agencies.c.agency_rank, agencies.c.cause_rank).all()
 
-    top_agencies_stats = agency_stats_query.all()
-
-    # Now, for each of those top agencies, find out their top 3 fire causes.
+    # The rows come grouped by agency, busiest first, with their causes in order.
     response = []
-    for agency_stat in top_agencies_stats:
-        top_causes_query = base_query.with_entities(
-            db_models.Wildfire.STAT_CAUSE_DESCR.label("cause"),
-            func.count(db_models.Wildfire.FOD_ID).label("count")
-        ).filter(
-            db_models.Wildfire.NWCG_REPORTING_AGENCY == agency_stat.agency_name,
-            db_models.Wildfire.STAT_CAUSE_DESCR.isnot(None)
-        ).group_by(
-            "cause"
-        ).order_by(
-            func.count(db_models.Wildfire.FOD_ID).desc()
-        ).limit(3)
-
-        top_causes_raw = top_causes_query.all()
-
-        # We need to build the Pydantic model manually to match the expected output format.
-        top_causes_result = [
-            schemas.AgencyCauseSummary(cause=row.cause, count=row.count)
-            for row in top_causes_raw
-        ]
-
-        # Finally, combine the general stats and the top causes into one object.
-        response.append(
-            schemas.AgencyPerformance(
-                agency_name=agency_stat.agency_name,
-                fire_count=agency_stat.fire_count,
-                avg_fire_size=agency_stat.avg_fire_size or 0,
-                avg_duration=agency_stat.avg_duration or 0,
-                complex_fire_count=agency_stat.complex_fire_count,
-                top_causes=top_causes_result
+    for row in rows:
+        if not response or response[-1].agency_name != row.agency:
+            response.append(
+                schemas.AgencyPerformance(
+                    agency_name=row.agency,
+                    fire_count=row.fire_count,
+                    avg_fire_size=row.avg_fire_size or 0,
+                    avg_duration=row.avg_duration or 0,
+                    complex_fire_count=row.complex_fire_count,
+                    top_causes=[]
+                )
             )
-        )
+        if row.cause is not None and row.cause_rank <= top_causes_k:
+            response[-1].top_causes.append(schemas.AgencyCauseSummary(cause=row.cause, count=row.cause_count))
 
     return response
 
@@ -306,7 +477,7 @@ def get_aggregate_data(group_by: str, db: Session = Depends(get_db)):
     query = db.query(
         column_to_group.label("group"),
         func.count(db_models.Wildfire.FOD_ID).label("count")
-    ).filter(column_to_group.isnot(None)).group_by(column_to_group).order_by(column_to_group.asc()).all()
+    ).filter(column_to_group.isnot(None)).group_by(column_to_group).order_by(decoded(column_to_group).asc()).all()
     return [{"group": str(row.group), "count": row.count} for row in query]
 
 # Provides aggregated fire counts by county for the heatmap.
@@ -318,25 +489,17 @@ def get_filtered_county_aggregates(
     state: Optional[str] = None,
     cause: Optional[str] = None
 ):
+    # The full 5-digit county FIPS id is worked out by the ETL, so we can group on it directly.
     query = db.query(
-        db_models.Wildfire.STATE,
-        db_models.Wildfire.FIPS_CODE,
+        db_models.Wildfire.COUNTY_FIPS.label("group"),
         func.count(db_models.Wildfire.FOD_ID).label("count")
-    ).filter(db_models.Wildfire.FIPS_CODE.isnot(None))
+    ).filter(db_models.Wildfire.COUNTY_FIPS.isnot(None))
 
     query = apply_date_range_filter(query, start_date, end_date)
     if state: query = query.filter(db_models.Wildfire.STATE == state)
     if cause and cause != 'All': query = query.filter(db_models.Wildfire.STAT_CAUSE_DESCR == cause)
 
-    raw_results = query.group_by(db_models.Wildfire.STATE, db_models.Wildfire.FIPS_CODE).all()
-    response = []
-    for state_abbr, county_code, count in raw_results:
-        state_fips = STATE_TO_FIPS.get(state_abbr)
-        if state_fips and county_code is not None:
-            # We combine the state and county codes to create the full FIPS id.
-            full_fips = state_fips + str(int(county_code)).zfill(3)
-            response.append({"group": full_fips, "count": count})
-    return response
+    return query.group_by("group").all()
 
 # Provides aggregated fire counts by state for the US map.
 @router.get("/aggregate/state", response_model=List[schemas.AggregateResult])
@@ -346,6 +509,20 @@ def get_filtered_state_aggregates(
     end_date: Optional[date] = None,
     cause: Optional[str] = None
 ):
+    if rollup_ready(db):
+        # Served from the pre-aggregated rollup instead of scanning every fire.
+        rollup = db_models.WildfireRollup
+        query = db.query(
+            rollup.STATE.label("group"),
+            func.sum(rollup.fire_count).label("count")
+        ).filter(rollup.STATE.isnot(None))
+
+        query = apply_rollup_date_range_filter(query, start_date, end_date)
+        if cause and cause != 'All':
+            query = query.filter(rollup.STAT_CAUSE_DESCR == cause)
+
+        return query.group_by("group").all()
+
     query = db.query(
         db_models.Wildfire.STATE.label("group"),
         func.count(db_models.Wildfire.FOD_ID).label("count")
@@ -388,45 +565,66 @@ def get_summary_statistics(
         actual_start_date = None
         actual_end_date = None
 
-    # Start with a base query and add state/cause filters if they exist.
-    base_query = db.query(db_models.Wildfire)
-    if state:
-        base_query = base_query.filter(db_models.Wildfire.STATE == state)
-    if cause:
-        base_query = base_query.filter(db_models.Wildfire.STAT_CAUSE_DESCR == cause)
-
-    # Calculate stats for the specific date range.
-    range_query = base_query
-    if actual_start_date and actual_end_date:
-        range_query = range_query.filter(
-            db_models.Wildfire.DISCOVERY_DATETIME >= actual_start_date,
-            db_models.Wildfire.DISCOVERY_DATETIME <= actual_end_date
-        )
-
-    range_stats = range_query.with_entities(
-        func.count(db_models.Wildfire.FOD_ID).label("incident_count"),
-        func.sum(db_models.Wildfire.FIRE_SIZE).label("total_acres_burned")
-    ).one()
-
-    # Also calculate cumulative stats up to the end of the date range.
-    cumulative_query = base_query
-    if actual_end_date:
-        cumulative_query = cumulative_query.filter(db_models.Wildfire.DISCOVERY_DATETIME <= actual_end_date)
+    if rollup_ready(db):
+        # Served from the pre-aggregated rollup instead of scanning every fire.
+        rollup = db_models.WildfireRollup
+        base_query = db.query(rollup)
+        if state:
+            base_query = base_query.filter(rollup.STATE == state)
+        if cause:
+            base_query = base_query.filter(rollup.STAT_CAUSE_DESCR == cause)
+        incident_count, acres_burned = func.sum(rollup.fire_count), func.sum(rollup.fire_size_sum)
+        date_filter = apply_rollup_date_range_filter
+        in_range = and_(true(), *rollup_date_range_conditions(actual_start_date, actual_end_date))
+    else:
+        # Start with a base query and add state/cause filters if they exist.
+        base_query = db.query(db_models.Wildfire)
+        if state:
+            base_query = base_query.filter(db_models.Wildfire.STATE == state)
+        if cause:
+            base_query = base_query.filter(db_models.Wildfire.STAT_CAUSE_DESCR == cause)
+        incident_count, acres_burned = func.count(db_models.Wildfire.FOD_ID), func.sum(db_models.Wildfire.FIRE_SIZE)
+        date_filter = apply_date_range_filter
+        in_range = true()
+        if actual_start_date and actual_end_date:
+            in_range = and_(
+                db_models.Wildfire.DISCOVERY_DATETIME >= actual_start_date,
+                db_models.Wildfire.DISCOVERY_DATETIME <= actual_end_date
+            )
 
-    cumulative_stats = cumulative_query.with_entities(
-        func.count(db_models.Wildfire.FOD_ID).label("incident_count"),
-        func.sum(db_models.Wildfire.FIRE_SIZE).label("total_acres_burned")
-    ).one()
+    if actual_end_date and cumulative_totals_ready(db):
+        # The cumulative numbers are a single lookup in the running totals the ETL keeps,
+        # so we only need to add up the range itself.
+        range_count, range_acres = date_filter(base_query, actual_start_date, actual_end_date).with_entities(
+            incident_count, acres_burned
+        ).one()
+        cumulative_count, cumulative_acres = cumulative_totals(db, actual_end_date, state, cause)
+    else:
+        # Everything up to the end date in one scan. The range is a subset of that, so its
+        # numbers come from the same rows with a FILTER clause.
+        range_count, range_acres, cumulative_count, cumulative_acres = date_filter(
+            base_query, None, actual_end_date
+        ).with_entities(
+            incident_count.filter(in_range), acres_burned.filter(in_range), incident_count, acres_burned
+        ).one()
 
     return {
-        "range_total_incidents": range_stats.incident_count or 0,
-        "range_total_acres": range_stats.total_acres_burned or 0,
-        "range_avg_acres": (range_stats.total_acres_burned / range_stats.incident_count) if range_stats.incident_count else 0,
-        "cumulative_total_incidents": cumulative_stats.incident_count or 0,
-        "cumulative_total_acres": cumulative_stats.total_acres_burned or 0,
-        "cumulative_avg_acres": (cumulative_stats.total_acres_burned / cumulative_stats.incident_count) if cumulative_stats.incident_count else 0
+        "range_total_incidents": range_count or 0,
+        "range_total_acres": range_acres or 0,
+        "range_avg_acres": ((range_acres or 0) / range_count) if range_count else 0,
+        "cumulative_total_incidents": cumulative_count or 0,
+        "cumulative_total_acres": cumulative_acres or 0,
+        "cumulative_avg_acres": ((cumulative_acres or 0) / cumulative_count) if cumulative_count else 0
     }
 
+# How many points the scatter plot gets by default, and the most it can ask for.
+CORRELATION_SAMPLE_SIZE = 5000
+MAX_CORRELATION_SAMPLE_SIZE = 50000
+
+# Filters that match fewer fires than this get sampled by sorting them, rather than by
+# walking the sample key index (see app/api/sampling.py).
+SMALL_SAMPLE_FILTER = 100000
+
 # Gathers data for the correlation scatter plot.
 @router.get("/statistics/correlation", response_model=schemas.CorrelationResponse)
 def get_correlation_data(
@@ -434,8 +632,17 @@ def get_correlation_data(
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     state: Optional[str] = None,
-    cause: Optional[str] = None
+    cause: Optional[str] = None,
+    sample_size: int = Query(CORRELATION_SAMPLE_SIZE, ge=1, le=MAX_CORRELATION_SAMPLE_SIZE),
+    seed: int = Query(0, ge=0, le=MAX_SEED)
 ):
+    """
+    A random sample of fires for the scatter plot. The same seed and filters always give
+    the same sample, so the plot doesn't jump around on refresh; change the seed for a new one.
+    """
+    if cause == 'All':
+        cause = None
+
     query = db.query(
         db_models.Wildfire.FIRE_SIZE.label("fire_size"),
         db_models.Wildfire.DISCOVERY_DOY.label("discovery_doy"),
@@ -453,10 +660,19 @@ def get_correlation_data(
 
     query = apply_date_range_filter(query, start_date, end_date)
     if state: query = query.filter(db_models.Wildfire.STATE == state)
-    if cause and cause != 'All': query = query.filter(db_models.Wildfire.STAT_CAUSE_DESCR == cause)
-
-    # We take a random sample to keep the plot from getting too crowded.
-    results = query.order_by(func.random()).limit(5000).all()
+    if cause: query = query.filter(db_models.Wildfire.STAT_CAUSE_DESCR == cause)
+
+    # The rollup tells us roughly how many fires match (before the outlier filters), which
+    # is all we need to pick the cheaper way of sampling. Without it we play safe and sort.
+    small = True
+    if rollup_ready(db):
+        rollup = db_models.WildfireRollup
+        estimate = apply_rollup_date_range_filter(db.query(func.sum(rollup.fire_count)), start_date, end_date)
+        if state: estimate = estimate.filter(rollup.STATE == state)
+        if cause: estimate = estimate.filter(rollup.STAT_CAUSE_DESCR == cause)
+        small = (estimate.scalar() or 0) < SMALL_SAMPLE_FILTER
+
+    results = seeded_sample(query, seed, sample_size, small=small)
     return {
         "sample_size": len(results),
         "data": results
@@ -470,56 +686,86 @@ def get_duration_distribution(
     end_date: Optional[date] = None,
     state: Optional[str] = None
 ):
-    query = db.query(db_models.Wildfire.FIRE_DURATION_DAYS).filter(
-        db_models.Wildfire.FIRE_DURATION_DAYS.isnot(None),
-        db_models.Wildfire.FIRE_DURATION_DAYS >= 0
-    )
-
+    query = db.query(db_models.Wildfire)
     query = apply_date_range_filter(query, start_date, end_date)
     if state: query = query.filter(db_models.Wildfire.STATE == state)
 
-    durations = pd.Series([row[0] for row in query.all()])
-    if durations.empty: return []
-
-    # We'll group the fire durations into daily bins up to 30 days.
-    bins = list(range(31)) + [float('inf')]
-    labels = [f"{i}-{i+1}" for i in range(29)] + ["29-30", "30+"]
-    binned_durations = pd.cut(durations, bins=bins, labels=labels, right=False)
-    bin_counts = binned_durations.value_counts().sort_index()
+    # We'll group the fire durations into daily bins up to 30 days, plus one for anything longer.
+    edges = list(range(31))
+    counts = histogram_counts(query, db_models.Wildfire.FIRE_DURATION_DAYS, edges, overflow=True)
+    if not any(counts): return []
 
-    response = [{"duration_bin": str(index), "fire_count": value} for index, value in bin_counts.items()]
+    labels = [f"{i}-{i+1}" for i in range(30)] + ["30+"]
+    response = [{"duration_bin": label, "fire_count": count} for label, count in zip(labels, counts)]
     return response
 
+# A histogram of any numeric column, with the binning done in the database.
+@router.get("/statistics/histogram", response_model=List[schemas.HistogramBin])
+def get_histogram(
+    column: str,
+    db: Session = Depends(get_db),
+    bins: int = Query(20, ge=1, le=MAX_BINS),
+    min_value: Optional[float] = None,
+    max_value: Optional[float] = None,
+    scale: str = Query("linear", pattern="^(linear|log)$"),
+    edges: Optional[str] = None,
+    overflow: bool = False,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    state: Optional[str] = None,
+    cause: Optional[str] = None
+):
+    """
+    Counts fires per bin of `column` (FIRE_SIZE, DISCOVERY_HOUR, DISCOVERY_DOY, ...).
+    Pass `edges` (e.g. '0,10,100,1000') for bins of your own, or `bins` equal-width bins
+    between min_value and max_value, on a linear or log scale. A missing min or max is
+    taken from the data. With overflow=true, values past the last edge get an open-ended
+    last bin (upper is null) instead of being left out.
+    """
+    target = histogram_column(column)
+    query = db.query(db_models.Wildfire)
+    query = apply_date_range_filter(query, start_date, end_date)
+    if state: query = query.filter(db_models.Wildfire.STATE == state)
+    if cause and cause != 'All': query = query.filter(db_models.Wildfire.STAT_CAUSE_DESCR == cause)
+
+    if edges:
+        bin_edges = parse_edges(edges)
+    else:
+        if min_value is None or max_value is None:
+            low, high = value_range(query, target, positive=(scale == "log"))
+            if low is None: return []
+            min_value = low if min_value is None else min_value
+            # The bins don't include their upper edge, so nudge it just past the largest value.
+            max_value = math.nextafter(high, math.inf) if max_value is None else max_value
+        if max_value <= min_value:
+            raise HTTPException(status_code=400, detail="max_value must be greater than min_value.")
+        make_edges = log_edges if scale == "log" else linear_edges
+        bin_edges = make_edges(min_value, max_value, bins)
+
+    counts = histogram_counts(query, target, bin_edges, overflow=overflow)
+    uppers = bin_edges[1:] + ([None] if overflow else [])
+    return [
+        {"lower": lower, "upper": upper, "count": count}
+        for lower, upper, count in zip(bin_edges, uppers, counts)
+    ]
+
 # Breaks down fire counts by size class for each major cause.
 @router.get("/summary/size-class-by-cause", response_model=List[schemas.SizeClassByCause])
 def get_size_class_distribution_by_cause(
     db: Session = Depends(get_db),
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-    state: Optional[str] = None
+    state: Optional[str] = None,
+    top_k: int = Query(4, ge=0)
 ):
-    base_query = db.query(db_models.Wildfire)
-    base_query = apply_date_range_filter(base_query, start_date, end_date)
-    if state: base_query = base_query.filter(db_models.Wildfire.STATE == state)
-    subquery = base_query.subquery()
-
-    # To keep the chart clean, we only show the top 4 causes and group the rest as 'Other'.
-    top_causes_query = db.query(subquery.c.STAT_CAUSE_DESCR).group_by(subquery.c.STAT_CAUSE_DESCR).order_by(func.count().desc()).limit(4)
-    top_causes = [row[0] for row in top_causes_query.all()]
-
-    cause_column = case((subquery.c.STAT_CAUSE_DESCR.in_(top_causes), subquery.c.STAT_CAUSE_DESCR), else_="Other").label("cause")
-
-    final_query = db.query(
-        subquery.c.FIRE_SIZE_CLASS.label("size_class"),
-        cause_column,
-        func.count(subquery.c.FOD_ID).label("fire_count")
-    ).filter(
-        subquery.c.FIRE_SIZE_CLASS.isnot(None),
-        subquery.c.STAT_CAUSE_DESCR.isnot(None)
-    ).group_by("size_class", "cause").order_by("size_class", "cause")
-
-    results = final_query.all()
-    return results
+    # To keep the chart clean, we only show the top causes overall and group the rest as 'Other'.
+    # Fires without a size class still count towards which causes make the top.
+    counts = grouped_counts(
+        db, {"partition": "FIRE_SIZE_CLASS", "category": "STAT_CAUSE_DESCR"},
+        start_date, end_date, state, not_null=["STAT_CAUSE_DESCR"]
+    )
+    results = top_k_with_other(db, counts, top_k, per_partition=False).order_by("partition", "category").all()
+    return [{"size_class": row.partition, "cause": row.category, "fire_count": row.count} for row in results]
 
 # Calculates the number of fires per month for each year.
 @router.get("/summary/monthly-frequency", response_model=List[schemas.MonthlyFireFrequency])
@@ -527,48 +773,15 @@ def get_monthly_fire_frequency(
     db: Session = Depends(get_db),
     state: Optional[str] = None
 ):
-    query = db.query(
-        extract('year', db_models.Wildfire.DISCOVERY_DATETIME).label('year'),
-        extract('month', db_models.Wildfire.DISCOVERY_DATETIME).label('month'),
-        func.count(db_models.Wildfire.FOD_ID).label('fire_count')
-    ).filter(
-        db_models.Wildfire.DISCOVERY_DATETIME.isnot(None)
-    )
-
-    if state:
-        query = query.filter(db_models.Wildfire.STATE == state)
-
-    query_results = query.group_by('year', 'month').order_by('year', 'month').all()
-
-    if not query_results:
-        return []
-
-    # Find the actual year range from the data to build a complete timeline.
-    year_query = db.query(
-        func.min(extract('year', db_models.Wildfire.DISCOVERY_DATETIME)),
-        func.max(extract('year', db_models.Wildfire.DISCOVERY_DATETIME))
-    ).filter(db_models.Wildfire.DISCOVERY_DATETIME.isnot(None))
-
-    if state:
-        year_query = year_query.filter(db_models.Wildfire.STATE == state)
-
-    min_max_year = year_query.one_or_none()
-
-    if not min_max_year or min_max_year[0] is None:
+    # A dense monthly series from the first month with fires to the last, read from the daily totals.
+    series = time_series(db, "month", state=state)
+    if not series:
         return []
 
-    min_year = int(min_max_year[0])
-    max_year = int(min_max_year[1])
-
     # Create a map to hold the data, ensuring all months are present for all years.
-    data_map = {year: [0] * 12 for year in range(min_year, max_year + 1)}
-
-    for row in query_results:
-        if row.year and row.month:
-            year = int(row.year)
-            month_index = int(row.month) - 1
-            if year in data_map and 0 <= month_index < 12:
-                data_map[year][month_index] = row.fire_count
+    data_map = {year: [0] * 12 for year in range(series[0][0].year, series[-1][0].year + 1)}
+    for period, fire_count, _ in series:
+        data_map[period.year][period.month - 1] = fire_count
 
     response = [
         schemas.MonthlyFireFrequency(
@@ -580,19 +793,49 @@ def get_monthly_fire_frequency(
 
     return response
 
+# Fire counts and acres over time at any granularity, for the timeline charts.
+@router.get("/temporal/series", response_model=List[schemas.TimeSeriesPoint])
+def get_time_series(
+    db: Session = Depends(get_db),
+    granularity: str = Query("month", pattern="^(day|week|month|year)$"),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    state: Optional[str] = None,
+    cause: Optional[str] = None
+):
+    """
+    One point per day, week (starting Monday), month or year, with no gaps: periods without
+    fires are there with zeros. Each point is labelled with the first day of its period.
+    """
+    try:
+        series = time_series(db, granularity, start_date, end_date, state, cause if cause != 'All' else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return [
+        {"period": period, "fire_count": fire_count, "total_acres": total_acres}
+        for period, fire_count, total_acres in series
+    ]
+
 # Fetches all fires for a given year, used for the yearly animation.
 @router.get("/fires/year/{year}", response_model=List[schemas.FirePoint])
 def get_fires_by_year(
     year: int,
     db: Session = Depends(get_db),
     state: Optional[str] = None,
-    cause: Optional[str] = None
+    cause: Optional[str] = None,
+    stream: bool = False,
+    output_format: Optional[str] = Query(None, alias="format"),
+    accept: Optional[str] = Header(None)
 ):
     """
     Get all fires for a specific year with optional state and cause filters.
     Returns all fire records without pagination, excluding smaller fires.
+    With ?stream=true (or Accept: application/x-ndjson) the fires are streamed
+    as NDJSON, one per line, while they're still being read from the database.
+    With ?format=packed (or Accept: application/x-fire-points) they come back in
+    the compact binary layout described in app/api/packed.py.
     """
-    query = db.query(db_models.Wildfire).filter(
+    query = fire_points_query(db).filter(
         db_models.Wildfire.FIRE_YEAR == year,
         db_models.Wildfire.FIRE_SIZE >= 5.0  # We filter out small fires to reduce noise.
     )
@@ -602,25 +845,43 @@ def get_fires_by_year(
     if cause and cause != 'All':
         query = query.filter(db_models.Wildfire.STAT_CAUSE_DESCR == cause)
 
-    fires_db = query.order_by(db_models.Wildfire.FIRE_SIZE.desc()).all()
-
-    fires_response = [
-        schemas.FirePoint(
-            fod_id=f.FOD_ID,
-            lat=f.LATITUDE,
-            lon=f.LONGITUDE,
-            cause=f.STAT_CAUSE_DESCR,
-            agency=f.NWCG_REPORTING_AGENCY,
-            fire_size=f.FIRE_SIZE,
-            fire_year=f.FIRE_YEAR,
-            state=f.STATE,
-            fire_name=f.FIRE_NAME,
-            county=f.COUNTY,
-            fire_size_class=f.FIRE_SIZE_CLASS
-        )
-        for f in fires_db if f.LATITUDE is not None and f.LONGITUDE is not None
-    ]
-    return fires_response
+    query = query.order_by(db_models.Wildfire.FIRE_SIZE.desc(), db_models.Wildfire.FOD_ID.desc())
+    if wants_ndjson(accept, stream):
+        return ndjson_response(query.statement)
+
+    fires = query.all()
+    if wants_packed(accept, output_format):
+        return packed_response(fires)
+    return JSONResponse([row._asdict() for row in fires])
+
+# The longest range of years one frames request can cover.
+MAX_FRAME_YEARS = 50
+# The years a frame can be built for: they have to be real calendar years, and fit the
+# frame header's uint16.
+FRAME_YEAR_RANGE = (1, 9999)
+
+# Streams pre-built animation frames for a range of years, for scrubbing through the timeline.
+@router.get("/fires/frames")
+def get_fire_frames(
+    start_year: int,
+    end_year: int,
+    state: Optional[str] = None,
+    cause: Optional[str] = None
+):
+    """
+    Returns one animation frame per year from start_year to end_year, in a single binary
+    stream (see app/api/frames.py). Each frame holds the same fires as /fires/year, in
+    discovery order, with an offset for the start of every day of the year.
+    """
+    # Everything is checked here, because once the stream has started an error can only cut it short.
+    first_year, last_year = FRAME_YEAR_RANGE
+    if not (first_year <= start_year <= last_year and first_year <= end_year <= last_year):
+        raise HTTPException(status_code=400, detail=f"Years must be between {first_year} and {last_year}.")
+    if end_year < start_year:
+        raise HTTPException(status_code=400, detail="end_year must not be before start_year.")
+    if end_year - start_year + 1 > MAX_FRAME_YEARS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_FRAME_YEARS} years per request.")
+    return frames_response(start_year, end_year, state or None, cause if cause != 'All' else None)
 
 # Endpoint for the radial chart showing fire causes.
 @router.get("/summary/causes", response_model=List[schemas.AggregateResult])
@@ -628,12 +889,33 @@ def get_cause_summary(
     db: Session = Depends(get_db),
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-    state: Optional[str] = None
+    state: Optional[str] = None,
+    top_k: Optional[int] = Query(None, ge=0)
 ):
     """
     Returns the total fire count for each cause, applying optional filters.
-    This is used to power the radial cause chart.
+    This is used to power the radial cause chart. With top_k, only the top k causes
+    are listed and the rest are summed up in an 'Other' entry.
     """
+    if top_k is not None:
+        counts = grouped_counts(db, {"category": "STAT_CAUSE_DESCR"}, start_date, end_date, state)
+        results = top_k_with_other(db, counts, top_k).order_by(desc("count")).all()
+        return [{"group": row.category, "count": row.count} for row in results]
+
+    if rollup_ready(db):
+        # Served from the pre-aggregated rollup instead of scanning every fire.
+        rollup = db_models.WildfireRollup
+        query = db.query(
+            rollup.STAT_CAUSE_DESCR.label("group"),
+            func.sum(rollup.fire_count).label("count")
+        ).filter(rollup.STAT_CAUSE_DESCR.isnot(None))
+
+        query = apply_rollup_date_range_filter(query, start_date, end_date)
+        if state:
+            query = query.filter(rollup.STATE == state)
+
+        return query.group_by("group").order_by(func.sum(rollup.fire_count).desc()).all()
+
     query = db.query(
         db_models.Wildfire.STAT_CAUSE_DESCR.label("group"),
         func.count(db_models.Wildfire.FOD_ID).label("count")
@@ -646,6 +928,12 @@ def get_cause_summary(
     results = query.group_by("group").order_by(func.count(db_models.Wildfire.FOD_ID).desc()).all()
     return results
 
+# How well the response cache is doing, and what's in it.
+@router.get("/cache/stats")
+def get_cache_stats():
+    """Hit/miss counters, memory use, compression ratios and bytes saved, and every cached entry with its size, hits, age and encodings."""
+    return response_cache.stats()
+
 # Looks up the state for a given latitude and longitude.
 @router.get("/geospatial/reverse-geocode")
 def reverse_geocode(lat: float, lon: float):
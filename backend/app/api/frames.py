@@ -0,0 +1,76 @@
+# backend/app/api/frames.py
+import struct
+import time
+
+import pandas as pd
+from fastapi.responses import StreamingResponse
+from sqlalchemy import exists, func, select
+
+from app.database import SessionLocal
+from app.etl.frames import frame_points_select, in_discovery_order
+from app.models import db_models
+from app.packing import FIRE_POINT_FIELDS, FRAME_MAGIC, empty_frame, pack_frame
+
+# Streams a range of years of animation frames (layout in app/packing.py) in one response.
+# Each frame is sent as a uint32 little-endian byte length followed by the frame itself, one
+# per year in order, so the client can start drawing the first year while the rest arrive.
+# Years with no matching fires still get an (empty) frame, so the timeline has no gaps.
+
+FRAMES_MEDIA_TYPE = "application/x-fire-frames"
+
+# How often we re-check whether the ETL has built the frames, in seconds.
+FRAMES_CHECK_INTERVAL = 60
+
+_frames_status = {"ready": False, "checked_at": 0.0}
+
+def frames_ready(db):
+    """
+    True once the ETL has filled 'animation_frames' with frames in the current layout.
+    Until then (or while they're from an older layout) we build frames on the fly.
+    """
+    now = time.monotonic()
+    if now - _frames_status["checked_at"] > FRAMES_CHECK_INTERVAL:
+        current_layout = func.substring(db_models.AnimationFrame.frame, 1, len(FRAME_MAGIC)) == FRAME_MAGIC
+        _frames_status["ready"] = bool(db.query(exists().where(current_layout)).scalar())
+        _frames_status["checked_at"] = now
+    return _frames_status["ready"]
+
+def _framed(frame):
+    return struct.pack("<I", len(frame)) + frame
+
+def _stored_frames(db, start_year, end_year, state, cause):
+    table = db_models.AnimationFrame
+    query = select(table.FIRE_YEAR, table.frame).where(
+        table.FIRE_YEAR.between(start_year, end_year),
+        table.STATE == state if state else table.STATE.is_(None),
+        table.STAT_CAUSE_DESCR == cause if cause else table.STAT_CAUSE_DESCR.is_(None),
+    ).order_by(table.FIRE_YEAR)
+    # Frames can be a few MB each, so we only hold a couple of them at a time.
+    stored = db.execute(query, execution_options={"yield_per": 2})
+    year = start_year
+    for frame_year, frame in stored:
+        for missing in range(year, frame_year):
+            yield _framed(empty_frame(missing))
+        yield _framed(bytes(frame))
+        year = frame_year + 1
+    for missing in range(year, end_year + 1):
+        yield _framed(empty_frame(missing))
+
+def _built_frames(db, start_year, end_year, state, cause):
+    # The slow path, straight from the 'wildfires' table, one year at a time.
+    for year in range(start_year, end_year + 1):
+        points = in_discovery_order(pd.read_sql(frame_points_select(year, state, cause), db.connection()), year)
+        yield _framed(pack_frame(year, points[FIRE_POINT_FIELDS + ["day"]]))
+
+def _frame_stream(start_year, end_year, state, cause):
+    # Like the NDJSON streams, this outlives the request's session, so it opens its own.
+    db = SessionLocal()
+    try:
+        frames = _stored_frames if frames_ready(db) else _built_frames
+        yield from frames(db, start_year, end_year, state, cause)
+    finally:
+        db.close()
+
+def frames_response(start_year, end_year, state=None, cause=None):
+    """Streams the frames for every year from start_year to end_year (inclusive)."""
+    return StreamingResponse(_frame_stream(start_year, end_year, state, cause), media_type=FRAMES_MEDIA_TYPE)
@@ -0,0 +1,79 @@
+# backend/app/api/histograms.py
+import numpy as np
+from fastapi import HTTPException
+from sqlalchemy import Float, cast, func
+from sqlalchemy.dialects.postgresql import ARRAY, array
+
+from app.models import db_models
+
+# Histograms worked out inside PostgreSQL. width_bucket() gives each value the number of
+# the bin it falls in, we GROUP BY that number, and only one count per bin comes back,
+# however many fires went into it.
+
+# The numeric columns a histogram can be taken over.
+HISTOGRAM_COLUMNS = {
+    name: getattr(db_models.Wildfire, name)
+    for name in [
+        "FIRE_SIZE", "FIRE_DURATION_DAYS", "DISCOVERY_DOY", "DISCOVERY_HOUR",
+        "DISCOVERY_MONTH", "LATITUDE", "LONGITUDE",
+    ]
+}
+
+MAX_BINS = 1000
+
+def histogram_column(name):
+    """Looks up a histogram column by name, or raises a 400 listing the ones we support."""
+    if name not in HISTOGRAM_COLUMNS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Can't make a histogram of '{name}'. Choose one of: {', '.join(HISTOGRAM_COLUMNS)}."
+        )
+    return HISTOGRAM_COLUMNS[name]
+
+def linear_edges(low, high, bins):
+    """`bins` equal-width bins from low to high."""
+    return np.linspace(low, high, bins + 1).tolist()
+
+def log_edges(low, high, bins):
+    """`bins` bins from low to high that are equally wide on a log scale. low must be positive."""
+    if low <= 0:
+        raise HTTPException(status_code=400, detail="Log-scale bins need a minimum above zero.")
+    return np.geomspace(low, high, bins + 1).tolist()
+
+def parse_edges(edges):
+    """Turns a comma-separated list like '0,1,10,100' into bin edges, checking they go up."""
+    try:
+        values = [float(value) for value in edges.split(",")]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Bin edges must be a comma-separated list of numbers.")
+    if len(values) < 2 or len(values) > MAX_BINS + 1 or any(b <= a for a, b in zip(values, values[1:])):
+        raise HTTPException(status_code=400, detail=f"Bin edges need between 2 and {MAX_BINS + 1} increasing numbers.")
+    return values
+
+def value_range(query, column, positive=False):
+    """The smallest and largest value of the column in the query, skipping non-positive ones if asked."""
+    query = query.filter(column.isnot(None))
+    if positive:
+        query = query.filter(column > 0)
+    return query.with_entities(func.min(column), func.max(column)).one()
+
+def histogram_counts(query, column, edges, overflow=False):
+    """
+    Counts the query's rows per bin. Bin i covers edges[i] <= value < edges[i + 1]; values
+    below the first edge are left out, and so are values from the last edge up, unless
+    overflow is set, in which case they get one extra open-ended bin at the end.
+    Returns a list with a count for every bin, empty ones included.
+    """
+    value = cast(column, Float)
+    # width_bucket numbers the bins from 1, with 0 for values below the first edge and
+    # len(edges) for values at or above the last one.
+    bucket = func.width_bucket(value, cast(array([float(edge) for edge in edges]), ARRAY(Float)))
+    query = query.filter(column.isnot(None), value >= edges[0])
+    if not overflow:
+        query = query.filter(value < edges[-1])
+    rows = query.with_entities(bucket, func.count()).group_by(bucket).all()
+
+    counts = [0] * (len(edges) - 1 + (1 if overflow else 0))
+    for bin_number, count in rows:
+        counts[bin_number - 1] = count
+    return counts
@@ -0,0 +1,16 @@
+# backend/app/api/packed.py
+from fastapi.responses import Response
+
+from app.packing import pack_fire_points
+
+# The compact binary alternative to the JSON list of FirePoints. The layout itself is
+# described (and encoded) in app/packing.py.
+
+PACKED_MEDIA_TYPE = "application/x-fire-points"
+
+def wants_packed(accept, format):
+    """True if the client asked for the binary layout, by Accept header or ?format=packed."""
+    return format == "packed" or PACKED_MEDIA_TYPE in (accept or "")
+
+def packed_response(rows, headers=None):
+    return Response(content=pack_fire_points(rows), media_type=PACKED_MEDIA_TYPE, headers=headers)
@@ -0,0 +1,76 @@
+# backend/app/api/pagination.py
+import base64
+import json
+import threading
+import time
+
+from fastapi import HTTPException
+from sqlalchemy import func
+
+from app.dataset import current_version
+from app.models import db_models
+from app.api.rollups import rollup_ready, apply_rollup_date_range_filter
+
+# Helpers for paging through the map's fires.
+#
+# Instead of OFFSET, which makes PostgreSQL walk past every earlier row, a page can carry
+# a cursor: the (FIRE_SIZE, FOD_ID) of the last fire it returned. The next page starts
+# right after that key, so page 50 is as cheap as page 1. The cursor is just that pair,
+# base64-encoded so clients treat it as an opaque token.
+
+def encode_cursor(fire_size, fod_id):
+    raw = json.dumps([fire_size, fod_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    """Turns a cursor back into (fire_size, fod_id). A malformed one is a 400, not a 500."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        fire_size, fod_id = json.loads(base64.urlsafe_b64decode(padded))
+        return float(fire_size), int(fod_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+
+# The map also asks for the total number of matching fires on every page it loads. Counting
+# them from the raw table is a full scan of the filtered set each time, so we get the
+# number from the rollup instead, or from a short-lived cache when the rollup isn't built.
+# The cache is keyed on the dataset version too, so a reload doesn't leave stale totals behind.
+
+# How long a counted total stays valid when it had to come from the raw table, in seconds.
+COUNT_CACHE_TTL = 300
+COUNT_CACHE_SIZE = 256
+
+_count_cache = {}
+_count_cache_lock = threading.Lock()
+
+def count_fires(db, raw_query, start_date, end_date, state, cause):
+    """
+    The number of fires matching the map filters. `raw_query` is the already filtered
+    query on the raw table, which we only count if the rollup can't answer.
+    """
+    if rollup_ready(db):
+        # The rollup has every dimension the map filters on, and counts the fires that have
+        # a location separately, so this matches what the pages contain exactly.
+        rollup = db_models.WildfireRollup
+        query = db.query(func.coalesce(func.sum(rollup.located_count), 0))
+        query = apply_rollup_date_range_filter(query, start_date, end_date)
+        if state:
+            query = query.filter(rollup.STATE == state)
+        if cause:
+            query = query.filter(rollup.STAT_CAUSE_DESCR == cause)
+        return int(query.scalar())
+
+    key = (current_version()[0], start_date, end_date, state, cause)
+    now = time.monotonic()
+    with _count_cache_lock:
+        cached = _count_cache.get(key)
+    if cached and now - cached[1] < COUNT_CACHE_TTL:
+        return cached[0]
+
+    total = raw_query.count()
+    with _count_cache_lock:
+        if len(_count_cache) >= COUNT_CACHE_SIZE:
+            # Throw out the oldest entry to keep the cache small.
+            del _count_cache[min(_count_cache, key=lambda k: _count_cache[k][1])]
+        _count_cache[key] = (total, now)
+    return total
@@ -0,0 +1,80 @@
+# backend/app/api/rollups.py
+import time
+
+from sqlalchemy import and_, exists, or_
+
+from app.models import db_models
+
+# Helpers for answering dashboard queries from the pre-aggregated 'wildfire_rollup'
+# table (built by run_data.py) instead of scanning the raw 'wildfires' table.
+
+# How often we re-check whether the rollup has been built, in seconds.
+ROLLUP_CHECK_INTERVAL = 60
+
+_rollup_status = {"ready": False, "checked_at": 0.0}
+_cumulative_status = {"ready": False, "checked_at": 0.0}
+_cells_status = {"ready": False, "checked_at": 0.0}
+
+def _filled(db, model, status):
+    now = time.monotonic()
+    if now - status["checked_at"] > ROLLUP_CHECK_INTERVAL:
+        status["ready"] = bool(db.query(exists().where(model.id.isnot(None))).scalar())
+        status["checked_at"] = now
+    return status["ready"]
+
+def rollup_ready(db):
+    """
+    True once the ETL has filled the rollup table. Until then (e.g. on a brand new
+    database) every endpoint falls back to querying the raw table.
+    """
+    return _filled(db, db_models.WildfireRollup, _rollup_status)
+
+def cumulative_totals_ready(db):
+    """True once the ETL has filled 'wildfire_cumulative_totals'."""
+    return _filled(db, db_models.CumulativeTotal, _cumulative_status)
+
+def cell_rollup_ready(db):
+    """True once the ETL has filled 'wildfire_cell_rollup'."""
+    return _filled(db, db_models.CellRollup, _cells_status)
+
+def apply_rollup_date_range_filter(query, start_date, end_date):
+    """
+    The rollup version of apply_date_range_filter. The raw filter compares a timestamp with a
+    date, so '<= end_date' means 'before end_date, or exactly at midnight on end_date'.
+    """
+    return query.filter(*rollup_date_range_conditions(start_date, end_date))
+
+def rollup_date_range_conditions(start_date, end_date):
+    """The conditions apply_rollup_date_range_filter adds, as a list, for use elsewhere in a query."""
+    rollup = db_models.WildfireRollup
+    conditions = []
+    if start_date:
+        conditions.append(rollup.DISCOVERY_DATE >= start_date)
+    if end_date:
+        conditions.append(or_(
+            rollup.DISCOVERY_DATE < end_date,
+            and_(rollup.DISCOVERY_DATE == end_date, rollup.DISCOVERED_AT_MIDNIGHT.is_(True))
+        ))
+    return conditions
+
+def cumulative_totals(db, end_date, state=None, cause=None):
+    """
+    The number of fires and acres burned from the start of the data up to end_date (with the
+    same midnight rule as the date filters), read from one row of 'wildfire_cumulative_totals'.
+    Returns (incident_count, total_acres_burned).
+    """
+    totals = db_models.CumulativeTotal
+    row = db.query(totals).filter(
+        totals.STATE == state if state else totals.STATE.is_(None),
+        totals.STAT_CAUSE_DESCR == cause if cause else totals.STAT_CAUSE_DESCR.is_(None),
+        totals.DISCOVERY_DATE <= end_date
+    ).order_by(totals.DISCOVERY_DATE.desc()).first()
+    if row is None:
+        return 0, 0.0
+    if row.DISCOVERY_DATE < end_date:
+        return row.cumulative_count, row.cumulative_acres
+    # On end_date itself only the fires found at midnight count.
+    return (
+        row.cumulative_count - row.day_count + row.midnight_count,
+        row.cumulative_acres - row.day_acres + row.midnight_acres
+    )
@@ -0,0 +1,31 @@
+# backend/app/api/sampling.py
+from app.models import db_models
+from app.sampling import SAMPLE_KEY_SPACE, seed_start
+
+# Takes a seeded random sample of any query over the 'wildfires' table, using the
+# precomputed SAMPLE_KEY column (see app/sampling.py for how the keys and seeds work).
+#
+# There are two ways to get the same sample. For a big filtered set we walk the
+# (SAMPLE_KEY, FOD_ID) index from the seed's start point and stop after `size` matches,
+# which only touches a few rows per sampled one. For a small set that walk could go through
+# most of the index before it finds enough matches, so we let the usual filter indexes find
+# the rows and sort just those by their distance from the start point instead.
+
+def seeded_sample(query, seed, size, small=False):
+    """
+    The first `size` rows of the query in the seed's shuffled order. Pass small=True when the
+    query is expected to match only a few rows. Either way the rows (and their order) are the same.
+    """
+    fire = db_models.Wildfire
+    start = seed_start(seed)
+    query = query.filter(fire.SAMPLE_KEY.isnot(None))
+
+    if small:
+        position = (fire.SAMPLE_KEY - start + SAMPLE_KEY_SPACE) % SAMPLE_KEY_SPACE
+        return query.order_by(position, fire.FOD_ID).limit(size).all()
+
+    rows = query.filter(fire.SAMPLE_KEY >= start).order_by(fire.SAMPLE_KEY, fire.FOD_ID).limit(size).all()
+    if len(rows) < size:
+        # Past the largest key, the shuffle carries on from the smallest one.
+        rows += query.filter(fire.SAMPLE_KEY < start).order_by(fire.SAMPLE_KEY, fire.FOD_ID).limit(size - len(rows)).all()
+    return rows
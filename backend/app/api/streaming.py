@@ -0,0 +1,35 @@
+# backend/app/api/streaming.py
+import json
+
+from fastapi.responses import StreamingResponse
+
+from app.database import SessionLocal
+
+# Helpers for sending big result sets as NDJSON (one JSON object per line) while they're
+# still being read, instead of building the whole list in memory first. The rows come
+# from a server-side cursor, so memory stays flat however many of them there are.
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# How many rows we pull from the cursor, and write out, at a time.
+STREAM_BATCH_SIZE = 2000
+
+def wants_ndjson(accept, stream):
+    """True if the client asked for streaming, with ?stream=true or an NDJSON Accept header."""
+    return bool(stream) or NDJSON_MEDIA_TYPE in (accept or "")
+
+def _ndjson_batches(statement, batch_size):
+    # The request's own session may be closed as soon as the endpoint returns, so the
+    # stream opens its own one and keeps it for as long as it's being read.
+    db = SessionLocal()
+    try:
+        # yield_per turns on a server-side cursor (stream_results) and hands back rows in batches.
+        result = db.execute(statement, execution_options={"yield_per": batch_size})
+        for batch in result.partitions():
+            yield "".join(json.dumps(row._asdict(), separators=(",", ":")) + "\n" for row in batch)
+    finally:
+        db.close()
+
+def ndjson_response(statement, batch_size=STREAM_BATCH_SIZE):
+    """Streams the rows of a select statement as NDJSON, one row per line, keyed by column label."""
+    return StreamingResponse(_ndjson_batches(statement, batch_size), media_type=NDJSON_MEDIA_TYPE)
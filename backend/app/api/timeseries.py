@@ -0,0 +1,111 @@
+# backend/app/api/timeseries.py
+from datetime import date, timedelta
+
+from sqlalchemy import Date, case, cast, func
+
+from app.api.rollups import cumulative_totals_ready
+from app.models import db_models
+
+# Fire counts and acres over time, at a day, week, month or year granularity, with every
+# period in the range present (zero if nothing happened). The numbers come from the per-day
+# rows in 'wildfire_cumulative_totals', so a 24-year series reads at most one row per day
+# instead of every fire.
+
+GRANULARITIES = ["day", "week", "month", "year"]
+
+# The longest series we'll build. That's over 50 years of days, far more than the data
+# covers, and it stops a range of centuries from building millions of points.
+MAX_PERIODS = 20000
+
+def period_start(day, granularity):
+    """The first day of the period `day` falls in. Weeks start on Monday, like date_trunc('week')."""
+    if granularity == "year":
+        return date(day.year, 1, 1)
+    if granularity == "month":
+        return date(day.year, day.month, 1)
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    return day
+
+def next_period(start, granularity):
+    if granularity == "year":
+        return date(start.year + 1, 1, 1)
+    if granularity == "month":
+        return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start + timedelta(days=7 if granularity == "week" else 1)
+
+def period_count(first, last, granularity):
+    """How many periods there are from the one starting on `first` to the one starting on `last`."""
+    if granularity == "year":
+        return last.year - first.year + 1
+    if granularity == "month":
+        return (last.year - first.year) * 12 + last.month - first.month + 1
+    return (last - first).days // (7 if granularity == "week" else 1) + 1
+
+def _daily_totals_query(db, granularity, start_date, end_date, state, cause):
+    totals = db_models.CumulativeTotal
+    period = cast(func.date_trunc(granularity, totals.DISCOVERY_DATE), Date)
+    fire_count, acres = totals.day_count, totals.day_acres
+    if end_date:
+        # The date filters only take the fires found at midnight on the end date itself.
+        on_end_date = totals.DISCOVERY_DATE == end_date
+        fire_count = case((on_end_date, totals.midnight_count), else_=totals.day_count)
+        acres = case((on_end_date, totals.midnight_acres), else_=totals.day_acres)
+        query_filters = [totals.DISCOVERY_DATE <= end_date]
+    else:
+        query_filters = []
+    if start_date:
+        query_filters.append(totals.DISCOVERY_DATE >= start_date)
+    return db.query(period, func.sum(fire_count), func.sum(acres)).filter(
+        totals.STATE == state if state else totals.STATE.is_(None),
+        totals.STAT_CAUSE_DESCR == cause if cause else totals.STAT_CAUSE_DESCR.is_(None),
+        *query_filters
+    ).group_by(period)
+
+def _raw_query(db, granularity, start_date, end_date, state, cause):
+    # Imported here because the endpoints module imports this one.
+    from app.api.endpoints import apply_date_range_filter
+
+    fire = db_models.Wildfire
+    period = cast(func.date_trunc(granularity, fire.DISCOVERY_DATETIME), Date)
+    query = db.query(period, func.count(fire.FOD_ID), func.coalesce(func.sum(fire.FIRE_SIZE), 0)).filter(
+        fire.DISCOVERY_DATETIME.isnot(None)
+    )
+    query = apply_date_range_filter(query, start_date, end_date)
+    if state:
+        query = query.filter(fire.STATE == state)
+    if cause:
+        query = query.filter(fire.STAT_CAUSE_DESCR == cause)
+    return query.group_by(period)
+
+def _check_length(first, last, granularity):
+    if first <= last and period_count(first, last, granularity) > MAX_PERIODS:
+        raise ValueError(f"That's more than {MAX_PERIODS} {granularity}s, use a shorter range or a coarser granularity.")
+
+def time_series(db, granularity, start_date=None, end_date=None, state=None, cause=None):
+    """
+    A dense series of (period start, fire count, acres) from the first period to the last:
+    the ones holding start_date and end_date if given, otherwise the first and last with fires.
+    Raises ValueError if that's more than MAX_PERIODS periods.
+    """
+    if start_date and end_date:
+        _check_length(period_start(start_date, granularity), period_start(end_date, granularity), granularity)
+    build = _daily_totals_query if cumulative_totals_ready(db) else _raw_query
+    found = {period: (count, acres or 0.0) for period, count, acres in build(db, granularity, start_date, end_date, state, cause)}
+
+    first = period_start(start_date, granularity) if start_date else min(found, default=None)
+    last = period_start(end_date, granularity) if end_date else max(found, default=None)
+    if first is None or last is None or first > last:
+        return []
+    _check_length(first, last, granularity)
+
+    series = []
+    period = first
+    for i in range(period_count(first, last, granularity)):
+        # Counting the periods rather than stepping past `last` means a range that ends
+        # in 9999 never tries to build the day after it.
+        if i:
+            period = next_period(period, granularity)
+        count, acres = found.get(period, (0, 0.0))
+        series.append((period, int(count), float(acres)))
+    return series
@@ -0,0 +1,48 @@
+# backend/app/api/topk.py
+from sqlalchemy import case, func
+
+from app.models.categories import decoded
+
+# "The top K categories, and everything else as 'Other'", for the charts that would
+# otherwise have a slice or a bar for every cause. It works on a subquery of counts that
+# has already been grouped (one row per partition and category, from the rollup or the raw
+# table), so the fires are only scanned once and the ranking and regrouping all happen in
+# the same statement.
+
+OTHER_LABEL = "Other"
+
+def top_k_with_other(db, counts, k, per_partition=True):
+    """
+    Takes a subquery with 'partition', 'category' and 'count' columns and returns a query of
+    (partition, category, count) rows where only the top k categories keep their label.
+    With per_partition the top k is worked out separately within each partition (say, each
+    day of the week), otherwise once over all of them. Rows with a NULL partition still
+    count towards the ranking but aren't returned. The category comes back as a label.
+    Without a 'partition' column in `counts`, the whole thing is one partition.
+    """
+    partition = counts.c.partition if "partition" in counts.c else None
+    columns = [partition] if partition is not None else []
+    if per_partition and partition is not None:
+        rank = func.row_number().over(
+            partition_by=partition, order_by=[counts.c.count.desc(), counts.c.category]
+        )
+    else:
+        # Window functions can't be nested, so each category's overall total gets its own layer.
+        totals = db.query(
+            *columns, counts.c.category, counts.c.count,
+            func.sum(counts.c.count).over(partition_by=counts.c.category).label("total")
+        ).subquery()
+        counts = totals
+        columns = [totals.c.partition] if partition is not None else []
+        rank = func.dense_rank().over(order_by=[totals.c.total.desc(), totals.c.category])
+
+    ranked = db.query(*columns, counts.c.category, counts.c.count, rank.label("rank")).subquery()
+
+    # The categories are stored as codes, so we turn them back into labels before mixing in 'Other'.
+    category = case((ranked.c.rank <= k, decoded(ranked.c.category)), else_=OTHER_LABEL).label("category")
+    count = func.sum(ranked.c.count).label("count")
+    if partition is None:
+        return db.query(category, count).group_by(category)
+    return db.query(ranked.c.partition, category, count).filter(
+        ranked.c.partition.isnot(None)
+    ).group_by(ranked.c.partition, category)
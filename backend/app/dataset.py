@@ -0,0 +1,51 @@
+# backend/app/dataset.py
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+
+from app.models import db_models
+
+# The data only changes when run_data.py runs, so everything the API works out from it
+# stays valid until the next load. The ETL marks each load with a new version in the
+# 'dataset_version' table, and the API checks that version (at most every few seconds)
+# to know when its cached results have gone stale.
+
+# How often the API looks for a new version, in seconds.
+VERSION_CHECK_INTERVAL = 5
+
+# What we report before the ETL has ever written a version.
+NO_VERSION = "none"
+
+def publish_version(conn):
+    """Called by the ETL at the end of a load. Returns the new version."""
+    table = db_models.DatasetVersion.__table__
+    version = uuid.uuid4().hex
+    conn.execute(table.delete())
+    # Stored in UTC (without a timezone, like the other timestamps), for the HTTP Last-Modified header.
+    loaded_at = datetime.now(timezone.utc).replace(tzinfo=None)
+    conn.execute(table.insert().values(id=1, version=version, loaded_at=loaded_at))
+    return version
+
+_current = {"version": NO_VERSION, "loaded_at": None, "checked_at": None}
+_lock = threading.Lock()
+
+def current_version():
+    """
+    (version, loaded_at) of the data the API is serving. Reads the database at most once
+    every VERSION_CHECK_INTERVAL seconds; in between it's just a dictionary lookup.
+    """
+    now = time.monotonic()
+    with _lock:
+        if _current["checked_at"] is None or now - _current["checked_at"] > VERSION_CHECK_INTERVAL:
+            # Imported here so the ETL can use publish_version without setting up the API's engine.
+            from app.database import engine
+
+            table = db_models.DatasetVersion
+            with engine.connect() as conn:
+                row = conn.execute(select(table.version, table.loaded_at).where(table.id == 1)).first()
+            _current["version"], _current["loaded_at"] = row if row else (NO_VERSION, None)
+            _current["checked_at"] = now
+        return _current["version"], _current["loaded_at"]
@@ -0,0 +1,72 @@
+# backend/app/etl/categories.py
+import sqlite3
+
+from sqlalchemy import select
+
+from app.features import CAUSE_CATEGORY_LABELS
+from app.models import db_models
+from app.models.categories import CATEGORICAL_COLUMNS, DAYS_OF_WEEK
+
+# Before the load starts, we make sure every label that can show up in the source has a
+# code in the 'category_labels' table. Codes are never reused or renumbered: a full reload
+# keeps the ones that are already there and only appends new labels at the end. That way
+# the API never has to worry about a code changing meaning underneath it.
+
+# Where each categorical column comes from in the SQLite database.
+SOURCE_TABLES = {
+    "STATE": "Fires",
+    "STAT_CAUSE_DESCR": "Fires",
+    "FIRE_SIZE_CLASS": "Fires",
+    "NWCG_REPORTING_AGENCY": "Fires",
+    "OWNER_DESCR": "Fires",
+    "GeographicArea": "NWCG_UnitIDActive_20170109",
+    "UnitType": "NWCG_UnitIDActive_20170109",
+    "Agency": "NWCG_UnitIDActive_20170109",
+}
+
+def source_labels(sqlite_path):
+    """Every distinct label of every categorical column, as {column: [labels]}."""
+    labels = {}
+    with sqlite3.connect(sqlite_path) as conn:
+        for column, source in SOURCE_TABLES.items():
+            rows = conn.execute(f"SELECT DISTINCT {column} FROM {source} WHERE {column} IS NOT NULL").fetchall()
+            labels[column] = sorted(row[0] for row in rows)
+    # These two come out of the transform, not the source. The day names go in calendar order.
+    labels["DISCOVERY_DAY_OF_WEEK"] = DAYS_OF_WEEK
+    labels["CAUSE_CATEGORY"] = CAUSE_CATEGORY_LABELS
+    return labels
+
+def sync_codebook(conn, labels):
+    """
+    Gives every label a code, keeping the codes that already exist.
+    Returns the full mapping as {column: {label: code}}, ready to pass to the transform.
+    """
+    table = db_models.CategoryLabel.__table__
+    codes = {column: {} for column in CATEGORICAL_COLUMNS}
+    for column, code, label in conn.execute(select(table.c.column_name, table.c.code, table.c.label)):
+        codes.setdefault(column, {})[label] = code
+
+    new_rows = []
+    for column, column_labels in labels.items():
+        mapping = codes.setdefault(column, {})
+        next_code = max(mapping.values(), default=-1) + 1
+        for label in column_labels:
+            if label not in mapping:
+                mapping[label] = next_code
+                new_rows.append({"column_name": column, "code": next_code, "label": label})
+                next_code += 1
+    if new_rows:
+        conn.execute(table.insert(), new_rows)
+    return codes
+
+def encode_categories(chunk, codes):
+    """Swaps the labels in every categorical column of a chunk for their codes, in place."""
+    for column in CATEGORICAL_COLUMNS:
+        mapping = codes[column]
+        encoded = chunk[column].map(mapping)
+        unknown = chunk[column].notna() & encoded.isna()
+        if unknown.any():
+            # This shouldn't happen, since the codebook is built from the same source before the load.
+            raise ValueError(f"No code for {column} value(s): {sorted(chunk.loc[unknown, column].unique())}")
+        chunk[column] = encoded.astype('Int16')
+    return chunk
@@ -0,0 +1,68 @@
+# backend/app/etl/extract.py
+import sqlite3
+
+import pandas as pd
+
+# This file holds the "E" part of our ETL: reading the raw data out of the
+# original FPA FOD SQLite database.
+
+# The NWCG lookup table tells us more about the agency unit that reported each fire.
+NWCG_QUERY = "SELECT UnitId, GeographicArea, UnitType, Agency, Name FROM NWCG_UnitIDActive_20170109"
+
+# This is the query to pull all the fire data we need from the original SQLite database.
+FIRES_QUERY = """
+SELECT 
+    FOD_ID, FIRE_NAME, FIRE_YEAR, STAT_CAUSE_DESCR, LATITUDE, LONGITUDE, STATE, 
+    OWNER_DESCR, OWNER_CODE, FIRE_SIZE, FIRE_SIZE_CLASS, DISCOVERY_DOY, 
+    DISCOVERY_DATE, DISCOVERY_TIME, CONT_DATE, CONT_TIME,
+    NWCG_REPORTING_AGENCY, NWCG_REPORTING_UNIT_ID, COMPLEX_NAME,
+    COUNTY, FIPS_CODE, FIPS_NAME
+FROM Fires
+"""
+
+# The year a fire is filed under in PostgreSQL (see transform_chunk): the year it was
+# discovered, or the source's FIRE_YEAR when there's no discovery date. SQLite reads a plain
+# number as a Julian day, just like pandas does with origin='julian'.
+FILED_YEAR_SQL = (
+    "CASE WHEN DISCOVERY_DATE IS NULL THEN FIRE_YEAR "
+    "ELSE CAST(strftime('%Y', DISCOVERY_DATE) AS INTEGER) END"
+)
+
+def load_nwcg(sqlite_path):
+    """Reads the whole (small) NWCG agency lookup table into memory."""
+    with sqlite3.connect(sqlite_path) as conn:
+        return pd.read_sql_query(NWCG_QUERY, conn)
+
+def read_fire_chunks(sqlite_path, chunk_size, after_fod_id=None, order_by=None, fire_year=None):
+    """
+    Yields the fires table in chunks. The SQLite connection is opened here, so
+    this works no matter which thread ends up iterating over it.
+
+    The incremental loader asks for the rows in FOD_ID order, starting after the
+    last FOD_ID it committed, so that a checkpoint means "everything up to here is done".
+    A full load asks for discovery order instead, which keeps the BRIN index on
+    DISCOVERY_DATETIME effective. Reloading a single year only reads the fires that will be
+    filed under that `fire_year`.
+    """
+    conditions = []
+    params = []
+    if after_fod_id is not None:
+        conditions.append("FOD_ID > ?")
+        params.append(int(after_fod_id))
+        order_by = "FOD_ID"
+    if fire_year is not None:
+        conditions.append(f"{FILED_YEAR_SQL} = ?")
+        params.append(int(fire_year))
+
+    query = FIRES_QUERY
+    if conditions:
+        query += "WHERE " + " AND ".join(conditions) + "\n"
+    if order_by:
+        query += f"ORDER BY {order_by}\n"
+
+    conn = sqlite3.connect(sqlite_path)
+    try:
+        for chunk in pd.read_sql_query(query, conn, params=params or None, chunksize=chunk_size):
+            yield chunk
+    finally:
+        conn.close()
@@ -0,0 +1,94 @@
+# backend/app/etl/frames.py
+import time
+
+import pandas as pd
+from sqlalchemy import Date, cast, func, select, text
+
+from app.models import db_models
+from app.packing import FIRE_POINT_FIELDS, days_in_year, pack_frame
+
+# After the rollup, the ETL packs every year's fires into ready-made animation frames
+# (see the 'animation_frames' table and the layout in app/packing.py). Each year is read
+# once, and every state/cause combination is cut out of that in pandas.
+
+# The same fires /fires/year shows: big enough to see, and with a location.
+MIN_FRAME_FIRE_SIZE = 5.0
+
+def frame_points_select(year, state=None, cause=None):
+    """The fires of one year with the FirePoint fields and their 0-based day of the year."""
+    fire = db_models.Wildfire
+    query = select(
+        fire.FOD_ID.label("fod_id"),
+        fire.LATITUDE.label("lat"),
+        fire.LONGITUDE.label("lon"),
+        fire.STAT_CAUSE_DESCR.label("cause"),
+        fire.NWCG_REPORTING_AGENCY.label("agency"),
+        fire.FIRE_SIZE.label("fire_size"),
+        fire.FIRE_YEAR.label("fire_year"),
+        fire.STATE.label("state"),
+        fire.FIRE_NAME.label("fire_name"),
+        fire.COUNTY.label("county"),
+        fire.FIRE_SIZE_CLASS.label("fire_size_class"),
+        (cast(fire.DISCOVERY_DATETIME, Date) - func.make_date(fire.FIRE_YEAR, 1, 1)).label("day"),
+        fire.DISCOVERY_DATETIME.label("discovered_at"),
+    ).where(
+        fire.FIRE_YEAR == year,
+        fire.FIRE_SIZE >= MIN_FRAME_FIRE_SIZE,
+        fire.LATITUDE.isnot(None),
+        fire.LONGITUDE.isnot(None),
+    )
+    if state:
+        query = query.where(fire.STATE == state)
+    if cause:
+        query = query.where(fire.STAT_CAUSE_DESCR == cause)
+    return query
+
+def in_discovery_order(points, year):
+    """
+    Sorts one year's points by day, then time of discovery. Fires without a date, or dated
+    outside FIRE_YEAR, lose their day and go at the end.
+    """
+    points = points.assign(day=points["day"].where(points["day"].between(0, days_in_year(year) - 1)))
+    return points.sort_values(["day", "discovered_at", "fod_id"], na_position="last", kind="stable")
+
+def year_frames(points, year):
+    """
+    Yields (state, cause, fire_count, frame) for every combination that has fires in
+    `points` (one year, in discovery order). None stands for "any state" / "any cause".
+    """
+    points = points[FIRE_POINT_FIELDS + ["day"]]
+    yield None, None, len(points), pack_frame(year, points)
+    # groupby keeps the rows of each group in their original order, i.e. still in discovery order.
+    for state, group in points.groupby("state", sort=True):
+        yield state, None, len(group), pack_frame(year, group)
+    for cause, group in points.groupby("cause", sort=True):
+        yield None, cause, len(group), pack_frame(year, group)
+    for (state, cause), group in points.groupby(["state", "cause"], sort=True):
+        yield state, cause, len(group), pack_frame(year, group)
+
+def rebuild_animation_frames(conn, years=None):
+    """
+    Replaces the frames of the given years (all of them by default) in one transaction.
+    Returns (frames written, bytes written, seconds).
+    """
+    start = time.perf_counter()
+    table = db_models.AnimationFrame.__table__
+    fire = db_models.Wildfire
+    if years is None:
+        conn.execute(text(f"TRUNCATE {table.name}"))
+        years = conn.execute(select(fire.FIRE_YEAR).distinct().order_by(fire.FIRE_YEAR)).scalars().all()
+    else:
+        conn.execute(table.delete().where(table.c.FIRE_YEAR.in_(years)))
+
+    frames = total_bytes = 0
+    for year in years:
+        points = in_discovery_order(pd.read_sql(frame_points_select(year), conn), year)
+        rows = [
+            {"FIRE_YEAR": year, "STATE": state, "STAT_CAUSE_DESCR": cause, "fire_count": count, "frame": frame}
+            for state, cause, count, frame in year_frames(points, year)
+        ]
+        conn.execute(table.insert(), rows)
+        frames += len(rows)
+        total_bytes += sum(len(row["frame"]) for row in rows)
+    conn.execute(text(f"ANALYZE {table.name}"))
+    return frames, total_bytes, time.perf_counter() - start
@@ -0,0 +1,187 @@
+# backend/app/etl/loaders.py
+import io
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Integer, text
+from sqlalchemy.types import TypeDecorator
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.etl.partitions import is_partitioned, partition_name
+
+# This file holds the "L" part of our ETL: the different ways we can push a
+# transformed chunk into the database.
+
+# The marker we use for missing values in the CSV we stream to PostgreSQL.
+# Empty strings stay empty strings, and only this marker becomes a real NULL.
+COPY_NULL = r'\N'
+
+def insert_chunk(conn, table, chunk):
+    """
+    The original loader: turn the chunk into a list of dicts and send it through executemany.
+    It's slow, but it works with any database SQLAlchemy supports, so we keep it as a fallback.
+    """
+    if chunk.empty:
+        return 0
+    # Pandas uses NaN for missing values, but our database prefers None (or NULL).
+    chunk = chunk.replace({pd.NaT: None, np.nan: None})
+    conn.execute(table.insert(), chunk.to_dict(orient='records'))
+    return len(chunk)
+
+def _as_copy_frame(table, chunk):
+    """Makes sure integer columns don't get written out as floats like '1992.0'."""
+    chunk = chunk.copy()
+    for column in table.columns:
+        # The category codes use a custom column type, so we look at the type underneath it.
+        column_type = column.type.impl_instance if isinstance(column.type, TypeDecorator) else column.type
+        if column.name in chunk.columns and isinstance(column_type, Integer):
+            chunk[column.name] = chunk[column.name].astype('Int64')
+    return chunk
+
+def _quoted_name(conn, name):
+    return conn.dialect.identifier_preparer.quote(name)
+
+def _copy_into(conn, target, chunk, table):
+    """Writes `chunk` into the (already quoted) `target` table with COPY FROM STDIN."""
+    buffer = io.StringIO()
+    _as_copy_frame(table, chunk).to_csv(buffer, header=False, index=False, na_rep=COPY_NULL)
+    buffer.seek(0)
+
+    # Our column names are case-sensitive (e.g. "FOD_ID", "GeographicArea"), so they need quoting.
+    columns = ", ".join(_quoted_name(conn, name) for name in chunk.columns)
+    copy_sql = f"COPY {target} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')"
+
+    # COPY isn't part of SQLAlchemy, so we borrow the raw psycopg2 cursor for this bit.
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_expert(copy_sql, buffer)
+    finally:
+        cursor.close()
+
+def copy_chunk(conn, table, chunk, target=None):
+    """
+    Streams a chunk straight into PostgreSQL with COPY FROM STDIN. The chunk is written to
+    an in-memory CSV buffer, so there are no per-row Python dicts and NULLs are written natively.
+
+    For the partitioned 'wildfires' table, each year's rows go straight into that year's
+    partition, which skips PostgreSQL's row-by-row partition routing. Pass `target` to
+    write everything into one specific table instead (e.g. a staging partition).
+    """
+    if chunk.empty:
+        return 0
+    if target is not None:
+        _copy_into(conn, _quoted_name(conn, target), chunk, table)
+    elif is_partitioned(table):
+        for year, rows in chunk.groupby('FIRE_YEAR', sort=False):
+            _copy_into(conn, _quoted_name(conn, partition_name(year)), rows, table)
+    else:
+        _copy_into(conn, _quoted_name(conn, table.name), chunk, table)
+    return len(chunk)
+
+# --- Incremental (upsert) loaders ---
+
+def changed_rows(conn, table, chunk):
+    """
+    Drops the rows whose ROW_HASH matches what's already stored for that FOD_ID.
+    Chunks arrive in FOD_ID order, so one primary-key range lookup covers the whole chunk.
+    """
+    if chunk.empty:
+        return chunk
+    existing = pd.read_sql_query(
+        text('SELECT "FOD_ID", "ROW_HASH" FROM wildfires WHERE "FOD_ID" BETWEEN :low AND :high'),
+        conn,
+        params={"low": int(chunk['FOD_ID'].min()), "high": int(chunk['FOD_ID'].max())}
+    )
+    if existing.empty:
+        return chunk
+    stored = chunk['FOD_ID'].map(existing.set_index('FOD_ID')['ROW_HASH'])
+    return chunk[stored.isna() | (stored != chunk['ROW_HASH'])]
+
+def delete_moved_rows(conn, table, chunk):
+    """
+    Deletes the stored rows for the chunk's FOD_IDs that are filed under a different FIRE_YEAR.
+    The upsert's conflict target is (FOD_ID, FIRE_YEAR), so a fire whose year changed in the
+    source would otherwise end up in the table twice, once under each year.
+    """
+    if chunk.empty:
+        return
+    conn.execute(
+        text(
+            f'DELETE FROM {_quoted_name(conn, table.name)} AS stored '
+            'USING unnest(CAST(:fod_ids AS integer[]), CAST(:years AS integer[])) AS incoming(fod_id, fire_year) '
+            'WHERE stored."FOD_ID" = incoming.fod_id AND stored."FIRE_YEAR" <> incoming.fire_year'
+        ),
+        {"fod_ids": [int(value) for value in chunk['FOD_ID']], "years": [int(value) for value in chunk['FIRE_YEAR']]}
+    )
+
+def _upsert_statement(table, columns, source):
+    """
+    INSERT ... ON CONFLICT (FOD_ID, FIRE_YEAR) DO UPDATE, but only when the content hash
+    actually differs. The partition key has to be part of the conflict target on a partitioned table,
+    which is why the loaders call delete_moved_rows first.
+    """
+    key_columns = [column.name for column in table.primary_key.columns]
+    statement = pg_insert(table).from_select(columns, source) if source is not None else pg_insert(table)
+    return statement.on_conflict_do_update(
+        index_elements=key_columns,
+        set_={name: statement.excluded[name] for name in columns if name not in key_columns},
+        where=table.c.ROW_HASH.is_distinct_from(statement.excluded.ROW_HASH)
+    )
+
+def upsert_chunk_copy(conn, table, chunk):
+    """
+    The incremental version of copy_chunk: only changed rows are streamed, into a temporary
+    staging table, and then merged into 'wildfires' with a single upsert. Rows whose
+    FIRE_YEAR changed are moved: the copy under the old year is deleted first.
+    """
+    chunk = changed_rows(conn, table, chunk)
+    if chunk.empty:
+        return 0
+    delete_moved_rows(conn, table, chunk)
+
+    stage = f"{table.name}_stage"
+    conn.execute(text(
+        f"CREATE TEMP TABLE IF NOT EXISTS {_quoted_name(conn, stage)} "
+        f"(LIKE {_quoted_name(conn, table.name)} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+    ))
+    _copy_into(conn, _quoted_name(conn, stage), chunk, table)
+
+    columns = list(chunk.columns)
+    stage_columns = ", ".join(_quoted_name(conn, name) for name in columns)
+    source = text(f"SELECT {stage_columns} FROM {_quoted_name(conn, stage)}").columns(*[table.c[name] for name in columns])
+    conn.execute(_upsert_statement(table, columns, source))
+    return len(chunk)
+
+def upsert_chunk_insert(conn, table, chunk):
+    """
+    The incremental version of insert_chunk, sending only changed rows through executemany.
+    Like upsert_chunk_copy, it deletes the old copy of a row whose FIRE_YEAR changed.
+    """
+    chunk = changed_rows(conn, table, chunk)
+    if chunk.empty:
+        return 0
+    delete_moved_rows(conn, table, chunk)
+    chunk = chunk.replace({pd.NaT: None, np.nan: None})
+    conn.execute(_upsert_statement(table, list(chunk.columns), None), chunk.to_dict(orient='records'))
+    return len(chunk)
+
+# The loaders we know about, keyed by the name used on the command line.
+LOADERS = {
+    "copy": copy_chunk,
+    "insert": insert_chunk,
+}
+
+# The incremental mode needs ON CONFLICT, which is why both of these are PostgreSQL-only.
+UPSERT_LOADERS = {
+    "copy": upsert_chunk_copy,
+    "insert": upsert_chunk_insert,
+}
+
+def pick_loader(engine, requested="auto"):
+    """Chooses a loader. 'auto' means COPY for PostgreSQL and plain inserts for everything else."""
+    if requested == "auto":
+        requested = "copy" if engine.dialect.name == "postgresql" else "insert"
+    if requested == "copy" and engine.dialect.name != "postgresql":
+        print(f" COPY is only supported on PostgreSQL, falling back to inserts for '{engine.dialect.name}'.")
+        requested = "insert"
+    return requested, LOADERS[requested]
@@ -0,0 +1,82 @@
+# backend/app/etl/partitions.py
+import sqlite3
+import uuid
+
+from sqlalchemy import MetaData, text
+
+from app.etl.extract import FILED_YEAR_SQL
+
+# The 'wildfires' table is range-partitioned on FIRE_YEAR with one partition per year.
+# This file creates those partitions and handles swapping a single year out for a
+# freshly loaded copy, so reloading one year never touches the other 23.
+
+def partition_name(year):
+    return f"wildfires_{int(year)}"
+
+def is_partitioned(table):
+    return bool(table.dialect_options["postgresql"].get("partition_by"))
+
+def source_years(sqlite_path):
+    """All the distinct years the fires in the SQLite source will be filed under."""
+    with sqlite3.connect(sqlite_path) as conn:
+        rows = conn.execute(
+            f"SELECT DISTINCT {FILED_YEAR_SQL} AS year FROM Fires WHERE FIRE_YEAR IS NOT NULL ORDER BY year"
+        ).fetchall()
+    return [int(row[0]) for row in rows if row[0] is not None]
+
+def create_year_partitions(conn, table, years):
+    """Makes sure there is a partition for every year in `years`. Existing ones are left alone."""
+    for year in years:
+        conn.execute(text(
+            f'CREATE TABLE IF NOT EXISTS "{partition_name(year)}" '
+            f'PARTITION OF "{table.name}" FOR VALUES FROM ({int(year)}) TO ({int(year) + 1})'
+        ))
+
+def create_staging_partition(conn, table, year):
+    """
+    Creates an empty standalone table shaped like one year's partition. It carries the
+    same indexes and a CHECK constraint on FIRE_YEAR, so attaching it later doesn't need
+    to scan the rows or build anything while holding the lock.
+    """
+    staging = f"{partition_name(year)}_staging"
+    conn.execute(text(f'DROP TABLE IF EXISTS "{staging}"'))
+    conn.execute(text(f'CREATE TABLE "{staging}" (LIKE "{table.name}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'))
+    conn.execute(text(
+        f'ALTER TABLE "{staging}" ADD CONSTRAINT "{staging}_year_check" '
+        f'CHECK ("FIRE_YEAR" IS NOT NULL AND "FIRE_YEAR" >= {int(year)} AND "FIRE_YEAR" < {int(year) + 1})'
+    ))
+    return staging
+
+def index_staging_partition(conn, table, staging, year):
+    """
+    Builds the primary key and every secondary index on the staging table. When it gets
+    attached, PostgreSQL adopts these as the partition's copies of the parent's indexes.
+    """
+    # Index names have to be unique, and the live partition still has its own until the swap,
+    # so each reload gets a short random tag in its index names.
+    prefix = f"{partition_name(year)}_{uuid.uuid4().hex[:8]}"
+    columns = ", ".join(f'"{column.name}"' for column in table.primary_key.columns)
+    conn.execute(text(f'ALTER TABLE "{staging}" ADD CONSTRAINT "{prefix}_pkey" PRIMARY KEY ({columns})'))
+
+    # A copy of the table definition pointed at the staging table gives us the same index DDL.
+    staging_table = table.to_metadata(MetaData(), name=staging)
+    for index in staging_table.indexes:
+        index.name = f"{prefix}_{index.name}"[:63]
+        index.create(conn)
+
+def swap_year_partition(conn, table, year, staging):
+    """
+    Replaces the live partition for `year` with the staging table in one short transaction.
+    Readers see either the old year or the new one, never a half-loaded mix.
+    """
+    live = partition_name(year)
+    exists = conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": live}).scalar()
+    if exists:
+        conn.execute(text(f'ALTER TABLE "{table.name}" DETACH PARTITION "{live}"'))
+        conn.execute(text(f'DROP TABLE "{live}"'))
+    conn.execute(text(
+        f'ALTER TABLE "{table.name}" ATTACH PARTITION "{staging}" '
+        f'FOR VALUES FROM ({int(year)}) TO ({int(year) + 1})'
+    ))
+    conn.execute(text(f'ALTER TABLE "{staging}" RENAME TO "{live}"'))
+    conn.execute(text(f'ANALYZE "{live}"'))
@@ -0,0 +1,125 @@
+# backend/app/etl/pipeline.py
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app.etl.transform import transform_chunk
+
+# This file runs the ETL as a pipeline instead of one step after another:
+#
+#   reader thread  ->  pool of transform processes  ->  bounded queue  ->  loader thread(s)
+#
+# While one chunk is being written to PostgreSQL, the next few are already being
+# read and transformed on the other cores. The queue between the stages is bounded,
+# so a slow database can't make us hold the whole dataset in memory.
+
+# Each worker process gets its own copy of the NWCG table and the category codes once,
+# when it starts, instead of us pickling them along with every single chunk.
+_worker_nwcg = None
+_worker_codes = None
+
+def _init_worker(nwcg, codes):
+    global _worker_nwcg, _worker_codes
+    _worker_nwcg = nwcg
+    _worker_codes = codes
+
+def _transform_in_worker(chunk):
+    """Runs inside a worker process. Returns the transformed chunk and how long it took."""
+    start = time.perf_counter()
+    result = transform_chunk(chunk, _worker_nwcg, _worker_codes)
+    return result, time.perf_counter() - start
+
+# This is what we put on the queue to tell a loader thread there's no more work.
+_DONE = None
+
+class PipelineStats:
+    """Keeps track of rows and busy time for each stage, shared between threads."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.rows_read = 0
+        self.rows_loaded = 0
+        self.chunks_loaded = 0
+        self.seconds = {"read": 0.0, "transform": 0.0, "load": 0.0}
+
+    def add(self, stage, seconds, rows_read=0, rows_loaded=0, chunks_loaded=0):
+        with self.lock:
+            self.seconds[stage] += seconds
+            self.rows_read += rows_read
+            self.rows_loaded += rows_loaded
+            self.chunks_loaded += chunks_loaded
+
+def run_pipeline(chunks, nwcg, codes, engine, table, load_chunk, workers=4, loaders=1, queue_depth=4, on_loaded=None):
+    """
+    Pushes every chunk from the `chunks` iterator through the transform workers and into
+    `table` using `load_chunk`. Returns a PipelineStats with per-stage timings.
+    If given, `on_loaded(i, chunk)` is called after chunk number `i` has been committed.
+    """
+    stats = PipelineStats()
+    # Each entry is (chunk number, future for the transformed chunk). Because the reader
+    # blocks when this is full, at most `queue_depth` chunks are waiting to be loaded.
+    transformed = queue.Queue(maxsize=queue_depth)
+    stop = threading.Event()
+    errors = []
+
+    def reader(pool):
+        try:
+            iterator = iter(chunks)
+            i = 0
+            while not stop.is_set():
+                start = time.perf_counter()
+                chunk = next(iterator, None)
+                if chunk is None:
+                    break
+                stats.add("read", time.perf_counter() - start, rows_read=len(chunk))
+                i += 1
+                future = pool.submit(_transform_in_worker, chunk)
+                # We use a timeout here so we notice if a loader died while we were waiting.
+                while not stop.is_set():
+                    try:
+                        transformed.put((i, future), timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            for _ in range(loaders):
+                transformed.put(_DONE)
+
+    def loader():
+        while True:
+            item = transformed.get()
+            if item is _DONE:
+                return
+            if stop.is_set():
+                continue # Something already failed, so we just drain the queue.
+            i, future = item
+            try:
+                chunk_final, transform_seconds = future.result()
+                stats.add("transform", transform_seconds)
+
+                start = time.perf_counter()
+                with engine.begin() as conn:
+                    rows = load_chunk(conn, table, chunk_final)
+                stats.add("load", time.perf_counter() - start, rows_loaded=rows, chunks_loaded=1)
+                if on_loaded:
+                    on_loaded(i, chunk_final)
+                print(f"   Loaded chunk {i} ({stats.rows_read:,} rows read, {stats.rows_loaded:,} written so far)...")
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(nwcg, codes)) as pool:
+        threads = [threading.Thread(target=reader, args=(pool,), name="etl-reader")]
+        threads += [threading.Thread(target=loader, name=f"etl-loader-{n+1}") for n in range(loaders)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+    return stats
@@ -0,0 +1,157 @@
+# backend/app/etl/rollups.py
+import time
+
+from sqlalchemy import Date, Integer, and_, case, cast, func, literal, or_, select, text, tuple_
+
+from app import grid
+from app.models import db_models
+
+# After the fires are loaded, we squash them down into the 'wildfire_rollup' table:
+# one row per combination of the dimensions the dashboard filters and groups on,
+# with the counts and sums it needs. All of it runs inside PostgreSQL.
+
+# The dimensions, in the same order as the GROUP BY.
+ROLLUP_DIMENSIONS = [
+    "STATE", "STAT_CAUSE_DESCR", "CAUSE_CATEGORY", "DISCOVERY_DATE", "DISCOVERED_AT_MIDNIGHT",
+    "DISCOVERY_HOUR", "DISCOVERY_DAY_OF_WEEK", "FIRE_SIZE_CLASS", "NWCG_REPORTING_AGENCY",
+]
+
+def rollup_select():
+    """The aggregate query that produces the rollup rows from the raw table."""
+    fire = db_models.Wildfire
+    dimensions = [
+        fire.STATE,
+        fire.STAT_CAUSE_DESCR,
+        fire.CAUSE_CATEGORY,
+        cast(fire.DISCOVERY_DATETIME, Date),
+        func.date_trunc('day', fire.DISCOVERY_DATETIME) == fire.DISCOVERY_DATETIME,
+        cast(fire.DISCOVERY_HOUR, Integer),
+        fire.DISCOVERY_DAY_OF_WEEK,
+        fire.FIRE_SIZE_CLASS,
+        fire.NWCG_REPORTING_AGENCY,
+    ]
+    measures = [
+        func.count(fire.FOD_ID),
+        func.sum(fire.FIRE_SIZE),
+        func.count(fire.FIRE_SIZE),
+        func.sum(fire.FIRE_DURATION_DAYS),
+        func.count(fire.FIRE_DURATION_DAYS),
+        func.count(case((and_(fire.LATITUDE.isnot(None), fire.LONGITUDE.isnot(None), fire.FIRE_SIZE.isnot(None)), 1))),
+    ]
+    return select(*dimensions, *measures).group_by(*dimensions)
+
+def rebuild_rollup(conn):
+    """Replaces the rollup contents in one transaction, so readers never see it half-built."""
+    start = time.perf_counter()
+    rollup = db_models.WildfireRollup.__table__
+    conn.execute(text(f"TRUNCATE {rollup.name}"))
+    columns = ROLLUP_DIMENSIONS + ["fire_count", "fire_size_sum", "fire_size_count", "duration_sum", "duration_count", "located_count"]
+    conn.execute(rollup.insert().from_select(columns, rollup_select()))
+    conn.execute(text(f"ANALYZE {rollup.name}"))
+    rows = conn.execute(select(func.count()).select_from(rollup)).scalar()
+    return rows, time.perf_counter() - start
+
+def cumulative_select():
+    """
+    Per-day running totals from the rollup, for every state, cause and state + cause,
+    plus the overall one. The NULLs GROUPING SETS leaves in a column mean "any".
+    """
+    rollup = db_models.WildfireRollup
+    midnight = rollup.DISCOVERED_AT_MIDNIGHT.is_(True)
+    days = select(
+        rollup.STATE,
+        rollup.STAT_CAUSE_DESCR,
+        rollup.DISCOVERY_DATE,
+        func.sum(rollup.fire_count).label("day_count"),
+        func.coalesce(func.sum(rollup.fire_size_sum), 0).label("day_acres"),
+        func.coalesce(func.sum(rollup.fire_count).filter(midnight), 0).label("midnight_count"),
+        func.coalesce(func.sum(rollup.fire_size_sum).filter(midnight), 0).label("midnight_acres"),
+    ).where(
+        rollup.DISCOVERY_DATE.isnot(None)
+    ).group_by(
+        func.grouping_sets(
+            tuple_(rollup.STATE, rollup.STAT_CAUSE_DESCR, rollup.DISCOVERY_DATE),
+            tuple_(rollup.STATE, rollup.DISCOVERY_DATE),
+            tuple_(rollup.STAT_CAUSE_DESCR, rollup.DISCOVERY_DATE),
+            tuple_(rollup.DISCOVERY_DATE),
+        )
+    ).having(
+        # Fires with no state (or cause) only belong in the "any" totals, where the NULL
+        # comes from the grouping. Otherwise they'd be mistaken for them.
+        and_(
+            or_(func.grouping(rollup.STATE) == 1, rollup.STATE.isnot(None)),
+            or_(func.grouping(rollup.STAT_CAUSE_DESCR) == 1, rollup.STAT_CAUSE_DESCR.isnot(None)),
+        )
+    ).subquery()
+
+    running = {"partition_by": [days.c.STATE, days.c.STAT_CAUSE_DESCR], "order_by": days.c.DISCOVERY_DATE}
+    return select(
+        days.c.STATE,
+        days.c.STAT_CAUSE_DESCR,
+        days.c.DISCOVERY_DATE,
+        func.sum(days.c.day_count).over(**running),
+        func.sum(days.c.day_acres).over(**running),
+        days.c.day_count,
+        days.c.day_acres,
+        days.c.midnight_count,
+        days.c.midnight_acres,
+    )
+
+def rebuild_cumulative_totals(conn):
+    """Replaces the running totals. Run it after rebuild_rollup, in the same transaction."""
+    start = time.perf_counter()
+    totals = db_models.CumulativeTotal.__table__
+    conn.execute(text(f"TRUNCATE {totals.name}"))
+    columns = [
+        "STATE", "STAT_CAUSE_DESCR", "DISCOVERY_DATE", "cumulative_count", "cumulative_acres",
+        "day_count", "day_acres", "midnight_count", "midnight_acres",
+    ]
+    conn.execute(totals.insert().from_select(columns, cumulative_select()))
+    conn.execute(text(f"ANALYZE {totals.name}"))
+    rows = conn.execute(select(func.count()).select_from(totals)).scalar()
+    return rows, time.perf_counter() - start
+
+# The grid zooms 'wildfire_cell_rollup' covers. At these a cell holds many fires, so the
+# per cell/state/cause/year rows are far fewer than the fires themselves. Finer cells hold
+# only a few fires each, and the map only asks for them over a small viewport, so those
+# are grouped from the raw table.
+CELL_ROLLUP_ZOOMS = list(range(grid.MIN_ZOOM, 9))
+
+CELL_ROLLUP_DIMENSIONS = ["STATE", "STAT_CAUSE_DESCR", "FIRE_YEAR", "DATED"]
+CELL_ROLLUP_MEASURES = ["fire_count", "latitude_sum", "longitude_sum", "fire_size_sum"]
+
+def finest_cells_select():
+    """The cell rollup rows at the finest zoom it covers, grouped from the raw table."""
+    fire = db_models.Wildfire
+    zoom = max(CELL_ROLLUP_ZOOMS)
+    cell = getattr(fire, grid.grid_column(zoom))
+    dimensions = [cell, fire.STATE, fire.STAT_CAUSE_DESCR, fire.FIRE_YEAR, fire.DISCOVERY_DATETIME.isnot(None)]
+    return select(
+        literal(zoom), *dimensions,
+        func.count(fire.FOD_ID), func.sum(fire.LATITUDE), func.sum(fire.LONGITUDE), func.sum(fire.FIRE_SIZE),
+    ).where(cell.isnot(None)).group_by(*dimensions)
+
+def coarser_cells_select(zoom):
+    """The cell rollup rows at `zoom`, summed up from the finest zoom's rows (a parent cell is `cell >> 2`)."""
+    cells = db_models.CellRollup
+    finest = max(CELL_ROLLUP_ZOOMS)
+    parent = cells.cell.op(">>")(2 * (finest - zoom))
+    dimensions = [parent, cells.STATE, cells.STAT_CAUSE_DESCR, cells.FIRE_YEAR, cells.DATED]
+    return select(
+        literal(zoom), *dimensions,
+        func.sum(cells.fire_count), func.sum(cells.latitude_sum), func.sum(cells.longitude_sum), func.sum(cells.fire_size_sum),
+    ).where(cells.zoom == finest).group_by(*dimensions)
+
+def rebuild_cell_rollup(conn):
+    """Replaces the cell rollup. Only the finest zoom reads the raw table; the rest come from it."""
+    start = time.perf_counter()
+    cells = db_models.CellRollup.__table__
+    conn.execute(text(f"TRUNCATE {cells.name}"))
+    columns = ["zoom", "cell"] + CELL_ROLLUP_DIMENSIONS + CELL_ROLLUP_MEASURES
+    conn.execute(cells.insert().from_select(columns, finest_cells_select()))
+    for zoom in CELL_ROLLUP_ZOOMS:
+        if zoom != max(CELL_ROLLUP_ZOOMS):
+            conn.execute(cells.insert().from_select(columns, coarser_cells_select(zoom)))
+    conn.execute(text(f"ANALYZE {cells.name}"))
+    rows = conn.execute(select(func.count()).select_from(cells)).scalar()
+    return rows, time.perf_counter() - start
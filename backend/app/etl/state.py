@@ -0,0 +1,85 @@
+# backend/app/etl/state.py
+import os
+import threading
+from datetime import datetime
+
+from sqlalchemy import text
+
+from app.etl.transform import TRANSFORM_VERSION
+from app.models import db_models
+
+# This file keeps the ETL checkpoint in the 'etl_state' table. A checkpoint is the
+# highest FOD_ID for which every row up to and including it has been committed,
+# which is all we need to resume a load that was interrupted.
+
+JOB_NAME = "wildfires"
+
+def source_signature(sqlite_path):
+    """
+    A cheap fingerprint of the SQLite file, so we know if the source changed since the last run.
+    The transform version is part of it, because new transform output needs a new pass too.
+    """
+    stats = os.stat(sqlite_path)
+    return f"{stats.st_size}:{stats.st_mtime_ns}:v{TRANSFORM_VERSION}"
+
+def get_state(conn, job=JOB_NAME):
+    """Returns the saved state row for a job, or None if it has never run."""
+    table = db_models.EtlState.__table__
+    return conn.execute(table.select().where(table.c.job == job)).first()
+
+def start_pass(conn, signature, job=JOB_NAME):
+    """Resets the checkpoint so the next load starts from the very first FOD_ID."""
+    table = db_models.EtlState.__table__
+    conn.execute(table.delete().where(table.c.job == job))
+    conn.execute(table.insert().values(
+        job=job, status="running", last_fod_id=None, chunks_committed=0,
+        source_signature=signature, updated_at=datetime.now()
+    ))
+
+def save_checkpoint(conn, last_fod_id, chunks, job=JOB_NAME):
+    """Moves the checkpoint forward. It never moves backwards, even if two loaders race."""
+    conn.execute(
+        text("""
+            UPDATE etl_state
+            SET last_fod_id = GREATEST(COALESCE(last_fod_id, :last_fod_id), :last_fod_id),
+                chunks_committed = chunks_committed + :chunks,
+                updated_at = :now
+            WHERE job = :job
+        """),
+        {"last_fod_id": int(last_fod_id), "chunks": chunks, "now": datetime.now(), "job": job}
+    )
+
+def finish_pass(conn, job=JOB_NAME):
+    """Marks the current pass as complete."""
+    table = db_models.EtlState.__table__
+    conn.execute(table.update().where(table.c.job == job).values(status="complete", updated_at=datetime.now()))
+
+class CheckpointTracker:
+    """
+    Works out how far the checkpoint can safely move. With several loader threads,
+    chunks can finish out of order, so we only advance past a chunk once every
+    chunk before it has been committed too.
+    """
+
+    def __init__(self, engine, job=JOB_NAME):
+        self.engine = engine
+        self.job = job
+        self.lock = threading.Lock()
+        self.finished = {} # chunk number -> highest FOD_ID in that chunk
+        self.next_chunk = 1
+
+    def chunk_loaded(self, i, chunk):
+        """Called after chunk `i` has been committed. Saves a new checkpoint if we can advance."""
+        with self.lock:
+            self.finished[i] = int(chunk['FOD_ID'].max()) if not chunk.empty else None
+            last_fod_id = None
+            advanced = 0
+            while self.next_chunk in self.finished:
+                chunk_max = self.finished.pop(self.next_chunk)
+                if chunk_max is not None:
+                    last_fod_id = chunk_max
+                self.next_chunk += 1
+                advanced += 1
+            if advanced and last_fod_id is not None:
+                with self.engine.begin() as conn:
+                    save_checkpoint(conn, last_fod_id, advanced, job=self.job)
@@ -0,0 +1,163 @@
+# backend/app/etl/transform.py
+import numpy as np
+import pandas as pd
+
+from app.etl.categories import encode_categories
+from app.features import cause_categories, county_fips, model_features
+from app.grid import GRID_ZOOMS, grid_cells, grid_column
+from app.sampling import sample_keys
+
+# This file holds the "T" part of our ETL: everything we do to a raw chunk from the
+# SQLite database before it's ready to be loaded into PostgreSQL.
+
+# These are the columns that end up in the final 'wildfires' table, in order.
+FINAL_COLUMNS = [
+    'FOD_ID', 'FIRE_NAME', 'FIRE_YEAR', 'STAT_CAUSE_DESCR', 'LATITUDE', 'LONGITUDE',
+    'STATE', 'OWNER_DESCR', 'OWNER_CODE', 'FIRE_SIZE', 'FIRE_SIZE_CLASS',
+    'COMPLEX_NAME', 'DISCOVERY_DOY', 'NWCG_REPORTING_AGENCY', 'NWCG_REPORTING_UNIT_ID',
+    'GeographicArea', 'UnitType', 'Agency', 'Name', 'COUNTY', 'FIPS_CODE', 'FIPS_NAME',
+    'DISCOVERY_DATETIME', 'CONT_DATETIME', 'DISCOVERY_MONTH',
+    'DISCOVERY_DAY_OF_WEEK', 'DISCOVERY_HOUR', 'FIRE_DURATION_DAYS', 'ROW_HASH',
+    'COUNTY_FIPS', 'CAUSE_CATEGORY', 'DOY_SIN', 'DOY_COS', 'LAT_LON_INTERACTION', 'SAMPLE_KEY'
+] + [grid_column(zoom) for zoom in GRID_ZOOMS]
+
+# Bump this whenever transform_chunk starts producing different output for the same source
+# row (a new derived column, say). It's part of the source signature, so the next incremental
+# run starts a new pass even if the SQLite file hasn't changed, and it goes into every row
+# hash, so that pass sees every row as changed and rewrites it with the new columns filled in.
+TRANSFORM_VERSION = 6
+
+# The raw columns (after the NWCG merge) that go into each row's content hash.
+# Numbers and text are hashed separately so that a column pandas happens to read as
+# ints in one chunk and floats (or all-None objects) in another still hashes the same.
+HASH_NUMERIC_COLUMNS = [
+    'FOD_ID', 'FIRE_YEAR', 'LATITUDE', 'LONGITUDE', 'OWNER_CODE', 'FIRE_SIZE',
+    'DISCOVERY_DOY', 'DISCOVERY_DATE', 'CONT_DATE'
+]
+HASH_TEXT_COLUMNS = [
+    'FIRE_NAME', 'STAT_CAUSE_DESCR', 'STATE', 'OWNER_DESCR', 'FIRE_SIZE_CLASS',
+    'DISCOVERY_TIME', 'CONT_TIME', 'NWCG_REPORTING_AGENCY', 'NWCG_REPORTING_UNIT_ID',
+    'COMPLEX_NAME', 'COUNTY', 'FIPS_CODE', 'FIPS_NAME',
+    'GeographicArea', 'UnitType', 'Agency', 'Name'
+]
+
+# --- The original row-by-row path ---
+# We keep these around so the benchmark can compare against them, but the
+# pipeline itself uses the vectorized versions further down.
+
+def clean_time(val):
+    """Turns a raw HHMM value into an 'HH:MM' string, falling back to midnight."""
+    val_str = str(val).split('.')[0].zfill(4)
+    if val_str.isdigit() and len(val_str) == 4:
+        hour = int(val_str[:2])
+        minute = int(val_str[2:])
+        if 0 <= hour <= 23 and 0 <= minute <= 59:
+            return f"{hour:02d}:{minute:02d}"
+    return "00:00" # If the time is invalid, we'll just default to midnight.
+
+def combine_date_and_time_rowwise(julian_dates, raw_times):
+    """The original approach: build a string and parse it once per row."""
+    times = raw_times.fillna('0000').apply(clean_time)
+    dates = pd.to_datetime(julian_dates, origin='julian', unit='D', errors='coerce')
+
+    def safe_combine(date_val, time_val):
+        if pd.isna(date_val): return pd.NaT
+        try: return pd.to_datetime(f"{date_val.date()} {time_val}")
+        except (ValueError, TypeError): return pd.NaT
+
+    return pd.Series(
+        [safe_combine(d, t) for d, t in zip(dates, times)],
+        index=julian_dates.index, dtype='datetime64[ns]'
+    )
+
+# --- The vectorized path ---
+
+def time_offsets(raw_times):
+    """
+    Parses a whole column of raw HHMM values into minutes past midnight using
+    array operations. It follows exactly the same rules as clean_time, so anything
+    that isn't a valid 24-hour time comes back as 0 (midnight).
+    """
+    # Same normalisation as clean_time: stringify, drop any decimal part, pad to 4 characters.
+    as_text = raw_times.fillna('0000').astype(str).str.split('.', n=1).str[0].str.zfill(4)
+    well_formed = (as_text.str.len() == 4) & as_text.str.isdigit().fillna(False).astype(bool)
+
+    # Only the well-formed values get converted; everything else is treated as '0000'.
+    digits = as_text.where(well_formed, '0000').astype(int).to_numpy()
+    hours, minutes = np.divmod(digits, 100)
+    in_range = (hours <= 23) & (minutes <= 59)
+
+    offsets = np.where(in_range, hours * 60 + minutes, 0)
+    return pd.Series(offsets, index=raw_times.index)
+
+def combine_date_and_time(julian_dates, raw_times):
+    """Converts Julian dates to datetimes and adds the parsed time of day to each one."""
+    dates = pd.to_datetime(julian_dates, origin='julian', unit='D', errors='coerce')
+    # Just like the original, we only keep the calendar day from the Julian value.
+    # Missing or unparseable dates stay NaT, since NaT plus anything is still NaT.
+    combined = dates.dt.normalize() + pd.to_timedelta(time_offsets(raw_times), unit='m')
+    return combined.astype('datetime64[ns]')
+
+# --- Change detection ---
+
+def row_hashes(chunk):
+    """
+    Computes a 64-bit content hash for every row of a merged raw chunk. The incremental
+    loader compares these against what's already in the database to skip unchanged rows.
+    """
+    normalized = pd.DataFrame(index=chunk.index)
+    for column in HASH_NUMERIC_COLUMNS:
+        normalized[column] = pd.to_numeric(chunk[column], errors='coerce').astype('float64')
+    for column in HASH_TEXT_COLUMNS:
+        values = chunk[column].astype(object)
+        normalized[column] = values.where(values.notna(), '\x00').astype(str)
+    normalized['TRANSFORM_VERSION'] = float(TRANSFORM_VERSION)
+    hashes = pd.util.hash_pandas_object(normalized, index=False).to_numpy()
+    # PostgreSQL has no unsigned 64-bit type, so we store the same bits as a signed BIGINT.
+    return pd.Series(hashes.view(np.int64), index=chunk.index)
+
+# --- The full chunk transform ---
+
+def transform_chunk(chunk, nwcg, codes):
+    """
+    Takes one raw chunk of fires and returns it cleaned up and ready to load.
+    `codes` is the category codebook from app/etl/categories.py.
+    """
+    # We'll merge the fire data with our agency lookup table.
+    chunk = chunk.merge(nwcg, left_on='NWCG_REPORTING_UNIT_ID', right_on='UnitId', how='left')
+    chunk['ROW_HASH'] = row_hashes(chunk)
+
+    # --- Cleaning up the date and time columns ---
+    # The original dates are in a Julian format, so we convert them to standard datetimes
+    # and add the discovery/containment times on top in one vectorized step.
+    chunk['DISCOVERY_DATETIME'] = combine_date_and_time(chunk['DISCOVERY_DATE'], chunk['DISCOVERY_TIME'])
+    chunk['CONT_DATETIME'] = combine_date_and_time(chunk['CONT_DATE'], chunk['CONT_TIME'])
+    # A few fires in the source are filed under the year after they were discovered (found on
+    # December 31st, reported on January 1st). We file every fire under its discovery year, so
+    # the API can bound the FIRE_YEAR partitions by a date range exactly. Keep FILED_YEAR_SQL
+    # in app/etl/extract.py in step with this.
+    chunk['FIRE_YEAR'] = chunk['DISCOVERY_DATETIME'].dt.year.fillna(chunk['FIRE_YEAR']).astype('int64')
+
+    # --- Feature Engineering ---
+    # Now we can create some new, useful columns from the cleaned data.
+    chunk['FIRE_DURATION_DAYS'] = ((chunk['CONT_DATETIME'] - chunk['DISCOVERY_DATETIME']).dt.total_seconds() / (24 * 60 * 60))
+    chunk['DISCOVERY_MONTH'] = chunk['DISCOVERY_DATETIME'].dt.month
+    chunk['DISCOVERY_DAY_OF_WEEK'] = chunk['DISCOVERY_DATETIME'].dt.day_name()
+    chunk['DISCOVERY_HOUR'] = chunk['DISCOVERY_DATETIME'].dt.hour
+
+    # The map tile ids at every zoom level, so the API can group and filter by location with integers.
+    for column, cells in grid_cells(chunk['LATITUDE'], chunk['LONGITUDE']).items():
+        chunk[column] = cells
+
+    # Values the API and the cause model used to work out on every request (see app/features.py).
+    chunk['COUNTY_FIPS'] = county_fips(chunk['STATE'], chunk['FIPS_CODE'])
+    chunk['CAUSE_CATEGORY'] = cause_categories(chunk['STAT_CAUSE_DESCR'])
+    chunk['DOY_SIN'], chunk['DOY_COS'], chunk['LAT_LON_INTERACTION'] = model_features(
+        chunk['DISCOVERY_DOY'], chunk['LATITUDE'], chunk['LONGITUDE']
+    )
+    # A fixed random position for every fire, for the sampled endpoints (see app/sampling.py).
+    chunk['SAMPLE_KEY'] = sample_keys(chunk['FOD_ID'])
+
+    # We'll select only the columns we actually need for our final database table,
+    # with the low-cardinality text columns swapped for their small integer codes.
+    return encode_categories(chunk[FINAL_COLUMNS].copy(), codes)
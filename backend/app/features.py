@@ -0,0 +1,65 @@
+# backend/app/features.py
+import numpy as np
+import pandas as pd
+
+# Derived values that used to be worked out again on every API request. The ETL now
+# stores them as columns on the 'wildfires' table, and anything that still needs them
+# for a single record (like the prediction endpoint) calls the same functions here,
+# so the two can never drift apart.
+
+# A handy dictionary to map state abbreviations to their FIPS codes.
+STATE_TO_FIPS = {
+    'AL': '01', 'AK': '02', 'AZ': '04', 'AR': '05', 'CA': '06', 'CO': '08', 'CT': '09',
+    'DE': '10', 'FL': '12', 'GA': '13', 'HI': '15', 'ID': '16', 'IL': '17', 'IN': '18',
+    'IA': '19', 'KS': '20', 'KY': '21', 'LA': '22', 'ME': '23', 'MD': '24', 'MA': '25',
+    'MI': '26', 'MN': '27', 'MS': '28', 'MO': '29', 'MT': '30', 'NE': '31', 'NV': '32',
+    'NH': '33', 'NJ': '34', 'NM': '35', 'NY': '36', 'NC': '37', 'ND': '38', 'OH': '39',
+    'OK': '40', 'OR': '41', 'PA': '42', 'RI': '44', 'SC': '45', 'SD': '46', 'TN': '47',
+    'TX': '48', 'UT': '49', 'VT': '50', 'VA': '51', 'WA': '53', 'WV': '54', 'WI': '55', 'WY': '56'
+}
+
+# The broader groups the weekly summary chart uses. Any other cause counts as 'Other'.
+CAUSE_CATEGORIES = {
+    'Lightning': 'Lightning',
+    'Miscellaneous': 'Miscellaneous/Undefined',
+    'Missing/Undefined': 'Miscellaneous/Undefined',
+    'Debris Burning': 'Direct-Human',
+    'Arson': 'Direct-Human',
+    'Children': 'Direct-Human',
+    'Fireworks': 'Direct-Human',
+    'Smoking': 'Direct-Human',
+    'Equipment Use': 'Direct-Human',
+    'Powerline': 'Indirect-Human',
+    'Structure': 'Indirect-Human',
+    'Railroad': 'Indirect-Human',
+    'Campfire': 'Indirect-Human',
+}
+OTHER_CAUSE_CATEGORY = 'Other'
+# In alphabetical order, so the category codes sort the same way the labels do.
+CAUSE_CATEGORY_LABELS = sorted(set(CAUSE_CATEGORIES.values()) | {OTHER_CAUSE_CATEGORY})
+
+def county_fips(states, fips_codes):
+    """
+    Combines the state and county codes into the full 5-digit county FIPS id (e.g. '06037').
+    Missing or unusable codes give NULL.
+    """
+    state_fips = pd.Series(states).map(STATE_TO_FIPS)
+    county_codes = pd.to_numeric(pd.Series(fips_codes, index=state_fips.index), errors='coerce')
+    county_codes = county_codes.where(county_codes == county_codes.round())
+    county_part = county_codes.astype('Int64').astype('string').str.zfill(3)
+    full = state_fips.astype('string') + county_part
+    return full.astype(object).where(full.notna(), None)
+
+def cause_categories(causes):
+    """Maps each cause to its category. Fires without a cause stay NULL."""
+    causes = pd.Series(causes)
+    categories = causes.map(CAUSE_CATEGORIES).fillna(OTHER_CAUSE_CATEGORY)
+    return categories.where(causes.notna(), None)
+
+def model_features(discovery_doy, latitude, longitude):
+    """
+    The engineered features the cause model was trained on. Works on single values
+    and on whole columns alike. Returns (doy_sin, doy_cos, lat_lon_interaction).
+    """
+    angle = 2 * np.pi * discovery_doy / 365.0
+    return np.sin(angle), np.cos(angle), latitude * longitude
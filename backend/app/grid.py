@@ -0,0 +1,112 @@
+# backend/app/grid.py
+import numpy as np
+import pandas as pd
+
+# A hierarchical grid over the map, so spatial queries can work with integers instead of
+# comparing LATITUDE/LONGITUDE floats. The cells are the usual Web Mercator map tiles
+# (the same ones Leaflet uses), and each cell id is the tile's quadkey read as a number:
+# the bits of the tile's x and y are interleaved, most significant first.
+#
+# That numbering makes the grid nest nicely. A cell's parent one zoom level up is just
+# `cell >> 2`, and all of a cell's descendants at a finer zoom sit in one contiguous id
+# range (see cell_range). The ETL stores a column per zoom level on the 'wildfires' table.
+
+MIN_ZOOM = 4
+MAX_ZOOM = 12
+GRID_ZOOMS = list(range(MIN_ZOOM, MAX_ZOOM + 1))
+
+# Web Mercator can't go all the way to the poles, so latitudes get clamped to this.
+MAX_LATITUDE = 85.05112878
+
+def grid_column(zoom):
+    """The name of the 'wildfires' column holding the cell ids for this zoom level."""
+    return f"GRID_Z{zoom}"
+
+def tile_xy(latitudes, longitudes, zoom):
+    """Vectorized lat/lon -> map tile x/y at the given zoom, as float arrays (NaN where missing)."""
+    lat = np.clip(np.asarray(latitudes, dtype='float64'), -MAX_LATITUDE, MAX_LATITUDE)
+    lon = np.asarray(longitudes, dtype='float64')
+    n = 2 ** zoom
+    x = np.floor((lon + 180.0) / 360.0 * n)
+    lat_rad = np.radians(lat)
+    y = np.floor((1.0 - np.log(np.tan(lat_rad) + 1.0 / np.cos(lat_rad)) / np.pi) / 2.0 * n)
+    # Points right on the last edge (longitude 180, the clamped latitudes) still belong to the last tile.
+    return np.clip(x, 0, n - 1), np.clip(y, 0, n - 1)
+
+def interleave(x, y, zoom):
+    """Packs integer tile x/y arrays into quadkey numbers (y bits in the higher position of each pair)."""
+    cell = np.zeros(len(x), dtype='int64')
+    for bit in range(zoom):
+        cell |= ((x >> bit) & 1) << (2 * bit)
+        cell |= ((y >> bit) & 1) << (2 * bit + 1)
+    return cell
+
+def grid_cells(latitudes, longitudes):
+    """
+    Works out the cell id of every point at every zoom in GRID_ZOOMS.
+    Returns a dict of column name -> nullable Int64 Series. Points without coordinates get NULL.
+    """
+    latitudes = pd.Series(latitudes)
+    x, y = tile_xy(latitudes, longitudes, MAX_ZOOM)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    finest = np.zeros(len(x), dtype='int64')
+    finest[valid] = interleave(x[valid].astype('int64'), y[valid].astype('int64'), MAX_ZOOM)
+
+    # We only do the trig once, at the finest zoom. Every coarser cell is a prefix of it.
+    cells = {}
+    for zoom in GRID_ZOOMS:
+        ids = pd.array(finest >> (2 * (MAX_ZOOM - zoom)), dtype='Int64')
+        ids[~valid] = pd.NA
+        cells[grid_column(zoom)] = pd.Series(ids, index=latitudes.index)
+    return cells
+
+def cell_range(cell, zoom, target_zoom=MAX_ZOOM):
+    """The [first, last] ids at target_zoom that lie inside `cell` (a cell at `zoom`)."""
+    shift = 2 * (target_zoom - zoom)
+    return cell << shift, ((cell + 1) << shift) - 1
+
+def cell_bounds(cell, zoom):
+    """The (south, west, north, east) edges of a cell in degrees."""
+    x = y = 0
+    for bit in range(zoom):
+        x |= ((cell >> (2 * bit)) & 1) << bit
+        y |= ((cell >> (2 * bit + 1)) & 1) << bit
+    n = 2 ** zoom
+
+    def latitude(tile_y):
+        return float(np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * tile_y / n)))))
+
+    return latitude(y + 1), x / n * 360.0 - 180.0, latitude(y), (x + 1) / n * 360.0 - 180.0
+
+def cells_covering(south, west, north, east, zoom):
+    """
+    The ids of every cell at `zoom` that overlaps the box, sorted. A box with west > east
+    is taken to cross the antimeridian.
+    """
+    n = 2 ** zoom
+    (x_west, x_east), (y_north, y_south) = (
+        tile_xy([north, south], [west, east], zoom)
+    )
+    x_west, x_east, y_north, y_south = int(x_west), int(x_east), int(y_north), int(y_south)
+    if west <= east:
+        xs = np.arange(x_west, x_east + 1)
+    else:
+        xs = np.concatenate([np.arange(x_west, n), np.arange(0, x_east + 1)])
+    ys = np.arange(y_north, y_south + 1)
+    grid_x, grid_y = np.meshgrid(xs, ys)
+    return np.sort(interleave(grid_x.ravel().astype('int64'), grid_y.ravel().astype('int64'), zoom))
+
+def merged_ranges(cells, zoom, target_zoom=MAX_ZOOM):
+    """
+    Turns a sorted list of cell ids at `zoom` into as few [first, last] id ranges at
+    target_zoom as possible. Neighbouring ids become one range, which happens a lot
+    because of how the quadkey numbering nests.
+    """
+    ranges = []
+    for cell in cells:
+        first, last = cell_range(int(cell), zoom, target_zoom)
+        if ranges and ranges[-1][1] + 1 == first:
+            ranges[-1] = (ranges[-1][0], last)
+        else:
+            ranges.append((first, last))
+    return ranges
@@ -1,6 +1,7 @@
 # /backend/app/main.py
 from fastapi import FastAPI
 from app.api import endpoints
+from app.api.cache import ResponseCacheMiddleware
 from fastapi.middleware.cors import CORSMiddleware
 from app.database import engine
 from app.models import db_models
@@ -16,6 +17,10 @@ db_models.Base.metadata.create_all(bind=engine)
 
 app = FastAPI(title="Wildfire Analytics API", version="1.0.0")
 
+# Repeated GETs are answered from an in-memory cache until the next data load (see app/api/cache.py).
+# It's added before CORS so it sits inside it, and cached responses still get their CORS headers.
+app.add_middleware(ResponseCacheMiddleware)
+
 # We need to set up CORS (Cross-Origin Resource Sharing) rules.
 # This is important because our frontend and backend are running on different addresses,
 # and this allows them to communicate securely.
@@ -1,11 +1,12 @@
 # /backend/app/ml/predictor.py
 import joblib
 import pandas as pd
-import numpy as np
 from datetime import datetime
 import os
 from typing import List, Dict
 
+from app.features import model_features
+
 # --- Constants & Model Loading ---
 
 # Let's find the model file. It's stored in the `ml_models` directory.
@@ -72,10 +73,11 @@ def preprocess_and_predict(input_data: Dict) -> List[Dict]:
     input_data.setdefault('OWNER_CODE', 1)
     input_data.setdefault('NWCG_REPORTING_AGENCY', 7)
 
-    # Now for a bit of feature engineering. We create the same special features the model was trained on.
-    input_data["doy_sin"] = np.sin(2 * np.pi * input_data["DISCOVERY_DOY"] / 365.0)
-    input_data["doy_cos"] = np.cos(2 * np.pi * input_data["DISCOVERY_DOY"] / 365.0)
-    input_data["lat_lon_interaction"] = input_data["LATITUDE"] * input_data["LONGITUDE"]
+    # Now for a bit of feature engineering. We create the same special features the model was trained on,
+    # with the same function the ETL uses for the DOY_SIN/DOY_COS/LAT_LON_INTERACTION columns.
+    input_data["doy_sin"], input_data["doy_cos"], input_data["lat_lon_interaction"] = model_features(
+        input_data["DISCOVERY_DOY"], input_data["LATITUDE"], input_data["LONGITUDE"]
+    )
 
     # Let's put all this processed data into a pandas DataFrame.
     df = pd.DataFrame([input_data])
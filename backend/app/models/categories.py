@@ -0,0 +1,122 @@
+# backend/app/models/categories.py
+import threading
+import time
+
+from sqlalchemy import SmallInteger, case, select
+from sqlalchemy.types import TypeDecorator
+
+# A handful of text columns only ever hold a few dozen different values (states, causes,
+# size classes, ...). Instead of repeating those strings on every row, the 'wildfires' and
+# 'wildfire_rollup' tables store a SMALLINT code, and the 'category_labels' table maps each
+# code back to its label. The ETL hands out the codes (see app/etl/categories.py).
+#
+# The Categorical column type below does the translating, so the rest of the code can keep
+# comparing these columns with plain strings and keeps getting plain strings back.
+
+CATEGORICAL_COLUMNS = [
+    "STATE", "STAT_CAUSE_DESCR", "FIRE_SIZE_CLASS", "NWCG_REPORTING_AGENCY",
+    "DISCOVERY_DAY_OF_WEEK", "OWNER_DESCR", "GeographicArea", "UnitType", "Agency", "CAUSE_CATEGORY",
+]
+
+# Days of the week get fixed codes in calendar order, so sorting by the code sorts Monday to Sunday.
+DAYS_OF_WEEK = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# What a label with no code turns into when we bind it into a query. No row ever has this
+# code, so filtering on a state or cause we've never seen simply matches nothing.
+MISSING_CODE = -1
+
+# If a query brings up a code or label we don't know yet (say the ETL just added a new one),
+# we reload the labels, but not more often than this many seconds.
+RELOAD_INTERVAL = 5
+
+class Codebook:
+    """The label <-> code mapping for every categorical column, loaded lazily from the database."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._codes = None  # column -> {label: code}
+        self._labels = None  # column -> {code: label}
+        self._loaded_at = None
+
+    def set(self, codes):
+        """Installs a mapping directly, as {column: {label: code}}."""
+        with self._lock:
+            self._codes = {column: dict(mapping) for column, mapping in codes.items()}
+            self._labels = {
+                column: {code: label for label, code in mapping.items()}
+                for column, mapping in self._codes.items()
+            }
+            self._loaded_at = time.monotonic()
+
+    def reload(self):
+        # Imported here because the models module imports this one.
+        from app.database import engine
+        from app.models.db_models import CategoryLabel
+
+        codes = {column: {} for column in CATEGORICAL_COLUMNS}
+        with engine.connect() as conn:
+            rows = conn.execute(select(CategoryLabel.column_name, CategoryLabel.code, CategoryLabel.label))
+            for column, code, label in rows:
+                codes.setdefault(column, {})[label] = code
+        self.set(codes)
+
+    def _ensure_loaded(self, refresh=False):
+        stale = self._loaded_at is None or (refresh and time.monotonic() - self._loaded_at > RELOAD_INTERVAL)
+        if stale:
+            self.reload()
+
+    def codes(self, column):
+        self._ensure_loaded()
+        return self._codes.get(column, {})
+
+    def code(self, column, label):
+        self._ensure_loaded()
+        code = self._codes.get(column, {}).get(label)
+        if code is None:
+            self._ensure_loaded(refresh=True)
+            code = self._codes.get(column, {}).get(label)
+        return MISSING_CODE if code is None else code
+
+    def label(self, column, code):
+        self._ensure_loaded()
+        label = self._labels.get(column, {}).get(code)
+        if label is None:
+            self._ensure_loaded(refresh=True)
+            label = self._labels.get(column, {}).get(code)
+        return label
+
+codebook = Codebook()
+
+class Categorical(TypeDecorator):
+    """A SMALLINT code in the database, its label everywhere in Python."""
+
+    impl = SmallInteger
+    cache_ok = True
+
+    def __init__(self, column):
+        super().__init__()
+        self.column = column
+
+    def process_bind_param(self, value, dialect):
+        # The ETL writes codes it already worked out, so numbers go straight through.
+        if value is None or not isinstance(value, str):
+            return value
+        return codebook.code(self.column, value)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return codebook.label(self.column, value)
+
+def decoded(expression):
+    """
+    Turns a categorical column into its label inside SQL, with a CASE over the known codes.
+    Useful when a query has to sort by the label, or mix the labels with other strings
+    (like an 'Other' bucket). Anything that isn't categorical is returned unchanged.
+    """
+    if not isinstance(expression.type, Categorical):
+        return expression
+    codes = codebook.codes(expression.type.column)
+    if not codes:
+        return expression
+    return case({code: label for label, code in codes.items()}, value=expression)
@@ -1,30 +1,34 @@
 # backend/app/models/db_models.py
-from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy import Column, Integer, SmallInteger, BigInteger, String, Float, Date, DateTime, Boolean, LargeBinary, Index, DDL, event
 from app.database import Base
+from app.models.categories import Categorical
 
 # This class defines what a "Wildfire" looks like in our database.
 # Each attribute here corresponds to a column in the 'wildfires' table.
+# The low-cardinality text columns (STATE, STAT_CAUSE_DESCR, ...) are stored as small integer
+# codes, but read and compare as their usual labels. See app/models/categories.py.
 class Wildfire(Base):
     __tablename__ = "wildfires"
 
     FOD_ID = Column(Integer, primary_key=True, name="FOD_ID")
     FIRE_NAME = Column(String, name="FIRE_NAME", nullable=True)
-    FIRE_YEAR = Column(Integer, name="FIRE_YEAR")
-    STAT_CAUSE_DESCR = Column(String, name="STAT_CAUSE_DESCR")
+    # FIRE_YEAR is part of the primary key because the table is partitioned on it (see below).
+    FIRE_YEAR = Column(Integer, primary_key=True, autoincrement=False, name="FIRE_YEAR")
+    STAT_CAUSE_DESCR = Column(Categorical("STAT_CAUSE_DESCR"), name="STAT_CAUSE_DESCR")
     LATITUDE = Column(Float, name="LATITUDE")
     LONGITUDE = Column(Float, name="LONGITUDE")
-    STATE = Column(String, name="STATE")
-    OWNER_DESCR = Column(String, name="OWNER_DESCR", nullable=True)
+    STATE = Column(Categorical("STATE"), name="STATE")
+    OWNER_DESCR = Column(Categorical("OWNER_DESCR"), name="OWNER_DESCR", nullable=True)
     OWNER_CODE = Column(Float, name="OWNER_CODE", nullable=True)
     FIRE_SIZE = Column(Float, name="FIRE_SIZE")
-    FIRE_SIZE_CLASS = Column(String, name="FIRE_SIZE_CLASS")
+    FIRE_SIZE_CLASS = Column(Categorical("FIRE_SIZE_CLASS"), name="FIRE_SIZE_CLASS")
     COMPLEX_NAME = Column(String, name="COMPLEX_NAME", nullable=True)
     DISCOVERY_DOY = Column(Integer, name="DISCOVERY_DOY")
-    NWCG_REPORTING_AGENCY = Column(String, name="NWCG_REPORTING_AGENCY", nullable=True)
+    NWCG_REPORTING_AGENCY = Column(Categorical("NWCG_REPORTING_AGENCY"), name="NWCG_REPORTING_AGENCY", nullable=True)
     NWCG_REPORTING_UNIT_ID = Column(String, name="NWCG_REPORTING_UNIT_ID", nullable=True)
-    GeographicArea = Column(String, name="GeographicArea", nullable=True)
-    UnitType = Column(String, name="UnitType", nullable=True)
-    Agency = Column(String, name="Agency", nullable=True)
+    GeographicArea = Column(Categorical("GeographicArea"), name="GeographicArea", nullable=True)
+    UnitType = Column(Categorical("UnitType"), name="UnitType", nullable=True)
+    Agency = Column(Categorical("Agency"), name="Agency", nullable=True)
     Name = Column(String, name="Name", nullable=True)
     COUNTY = Column(String, name="COUNTY", nullable=True)
     FIPS_CODE = Column(String, name="FIPS_CODE", nullable=True)
@@ -32,8 +36,205 @@ class Wildfire(Base):
     DISCOVERY_DATETIME = Column(DateTime, name="DISCOVERY_DATETIME", nullable=True)
     CONT_DATETIME = Column(DateTime, name="CONT_DATETIME", nullable=True)
     DISCOVERY_MONTH = Column(Float, name="DISCOVERY_MONTH", nullable=True)
-    DISCOVERY_DAY_OF_WEEK = Column(String, name="DISCOVERY_DAY_OF_WEEK", nullable=True)
+    DISCOVERY_DAY_OF_WEEK = Column(Categorical("DISCOVERY_DAY_OF_WEEK"), name="DISCOVERY_DAY_OF_WEEK", nullable=True)
     DISCOVERY_HOUR = Column(Float, name="DISCOVERY_HOUR", nullable=True)
     FIRE_DURATION_DAYS = Column(Float, name="FIRE_DURATION_DAYS", nullable=True)
+    # A hash of the source row, so the incremental ETL can tell which rows actually changed.
+    ROW_HASH = Column(BigInteger, name="ROW_HASH", nullable=True)
+    # Which map tile the fire falls in, at zoom levels 4 to 12. See app/grid.py for how the ids work.
+    GRID_Z4 = Column(Integer, name="GRID_Z4", nullable=True)
+    GRID_Z5 = Column(Integer, name="GRID_Z5", nullable=True)
+    GRID_Z6 = Column(Integer, name="GRID_Z6", nullable=True)
+    GRID_Z7 = Column(Integer, name="GRID_Z7", nullable=True)
+    GRID_Z8 = Column(Integer, name="GRID_Z8", nullable=True)
+    GRID_Z9 = Column(Integer, name="GRID_Z9", nullable=True)
+    GRID_Z10 = Column(Integer, name="GRID_Z10", nullable=True)
+    GRID_Z11 = Column(Integer, name="GRID_Z11", nullable=True)
+    GRID_Z12 = Column(Integer, name="GRID_Z12", nullable=True)
+    # Derived once by the ETL instead of on every request (see app/features.py).
+    COUNTY_FIPS = Column(String(5), name="COUNTY_FIPS", nullable=True) # State + county FIPS, e.g. '06037'.
+    CAUSE_CATEGORY = Column(Categorical("CAUSE_CATEGORY"), name="CAUSE_CATEGORY", nullable=True)
+    DOY_SIN = Column(Float, name="DOY_SIN", nullable=True)
+    DOY_COS = Column(Float, name="DOY_COS", nullable=True)
+    LAT_LON_INTERACTION = Column(Float, name="LAT_LON_INTERACTION", nullable=True)
+    # A hash of FOD_ID, so ordering by it shuffles the fires the same way every time (see app/sampling.py).
+    SAMPLE_KEY = Column(Integer, name="SAMPLE_KEY", nullable=True)
     
     __mapper_args__ = {'primary_key': [FOD_ID]}
+
+    # These indexes match the way the API actually filters and sorts. Almost every endpoint
+    # filters on a date range plus a state or a cause, and the map sorts by fire size.
+    # The ETL drops them before a full bulk load and builds them again at the end (see app/etl/indexes.py).
+    __table_args__ = (
+        Index("ix_wildfires_state_discovery", STATE, DISCOVERY_DATETIME),
+        Index("ix_wildfires_cause_discovery", STAT_CAUSE_DESCR, DISCOVERY_DATETIME),
+        Index("ix_wildfires_cause_category_discovery", CAUSE_CATEGORY, DISCOVERY_DATETIME),
+        Index("ix_wildfires_county_fips", COUNTY_FIPS),
+        # A BRIN index is tiny and works well here because the ETL writes fires in discovery order.
+        Index("ix_wildfires_discovery_brin", DISCOVERY_DATETIME, postgresql_using="brin"),
+        # The map query sorts by FIRE_SIZE DESC, FOD_ID DESC (which is also its pagination key) and
+        # only needs the FirePoint columns, so they're all included and PostgreSQL can answer it
+        # with an index-only scan.
+        Index(
+            "ix_wildfires_fire_size_map", FIRE_SIZE.desc(), FOD_ID.desc(),
+            postgresql_include=[
+                "LATITUDE", "LONGITUDE", "STAT_CAUSE_DESCR", "NWCG_REPORTING_AGENCY",
+                "FIRE_YEAR", "STATE", "FIRE_NAME", "COUNTY", "FIRE_SIZE_CLASS", "DISCOVERY_DATETIME"
+            ]
+        ),
+        # Every coarser grid cell is a contiguous range of GRID_Z12 ids, so this one index
+        # serves cell lookups and viewport filters at any zoom as plain integer range scans.
+        Index("ix_wildfires_grid_z12", GRID_Z12),
+        # Walking this in order is how the sampled endpoints take a random sample without sorting anything.
+        Index("ix_wildfires_sample_key", SAMPLE_KEY, FOD_ID),
+        # The table is split into one partition per FIRE_YEAR (wildfires_1992, wildfires_1993, ...).
+        # Queries that filter on the year only ever touch the partitions they need, and the ETL
+        # can reload a single year by swapping out its partition. See app/etl/partitions.py.
+        {"postgresql_partition_by": 'RANGE ("FIRE_YEAR")'},
+    )
+
+# Every partitioned table needs somewhere to put rows that don't match any partition,
+# so we create a catch-all DEFAULT partition together with the table. The ETL creates
+# the real per-year partitions before it loads anything, so this one normally stays empty.
+event.listen(
+    Wildfire.__table__, "after_create",
+    DDL('CREATE TABLE IF NOT EXISTS wildfires_default PARTITION OF wildfires DEFAULT').execute_if(dialect="postgresql")
+)
+
+# The labels behind the Categorical columns above, e.g. ('STATE', 4, 'CA').
+# The ETL only ever adds to this table, so a code always keeps meaning the same thing.
+class CategoryLabel(Base):
+    __tablename__ = "category_labels"
+
+    column_name = Column(String, primary_key=True)
+    code = Column(SmallInteger, primary_key=True)
+    label = Column(String, nullable=False)
+
+# This small table is where the ETL keeps track of its progress, so an
+# interrupted load can pick up where it left off instead of starting over.
+class EtlState(Base):
+    __tablename__ = "etl_state"
+
+    job = Column(String, primary_key=True)
+    status = Column(String, nullable=False, default="running") # 'running' or 'complete'
+    last_fod_id = Column(BigInteger, nullable=True) # Everything up to this FOD_ID has been committed.
+    chunks_committed = Column(Integer, nullable=False, default=0)
+    source_signature = Column(String, nullable=True) # Size and modification time of the SQLite file.
+    updated_at = Column(DateTime, nullable=True)
+
+
+# One row saying which load the data in the database came from. The ETL writes a new
+# version at the end of every run that changed anything, and the API's caches throw away
+# whatever they computed from an older one (see app/dataset.py).
+class DatasetVersion(Base):
+    __tablename__ = "dataset_version"
+
+    id = Column(Integer, primary_key=True) # Always 1.
+    version = Column(String, nullable=False)
+    loaded_at = Column(DateTime, nullable=False) # UTC.
+
+
+# A pre-aggregated "cube" of the wildfires table, rebuilt by the ETL after every load.
+# Most dashboard charts only filter on state, cause and a date range and then count or sum,
+# so they can read these few hundred thousand rows instead of scanning every fire.
+class WildfireRollup(Base):
+    __tablename__ = "wildfire_rollup"
+
+    id = Column(Integer, primary_key=True)
+    STATE = Column(Categorical("STATE"), name="STATE", nullable=True)
+    STAT_CAUSE_DESCR = Column(Categorical("STAT_CAUSE_DESCR"), name="STAT_CAUSE_DESCR", nullable=True)
+    # Follows from the cause, so it doesn't add any rows to the rollup.
+    CAUSE_CATEGORY = Column(Categorical("CAUSE_CATEGORY"), name="CAUSE_CATEGORY", nullable=True)
+    DISCOVERY_DATE = Column(Date, name="DISCOVERY_DATE", nullable=True)
+    # True when the fire was discovered at exactly 00:00. The API's date filters compare a
+    # timestamp to a plain date, so "<= end_date" only includes the midnight fires of that day.
+    DISCOVERED_AT_MIDNIGHT = Column(Boolean, name="DISCOVERED_AT_MIDNIGHT", nullable=True)
+    DISCOVERY_HOUR = Column(Integer, name="DISCOVERY_HOUR", nullable=True)
+    DISCOVERY_DAY_OF_WEEK = Column(Categorical("DISCOVERY_DAY_OF_WEEK"), name="DISCOVERY_DAY_OF_WEEK", nullable=True)
+    FIRE_SIZE_CLASS = Column(Categorical("FIRE_SIZE_CLASS"), name="FIRE_SIZE_CLASS", nullable=True)
+    NWCG_REPORTING_AGENCY = Column(Categorical("NWCG_REPORTING_AGENCY"), name="NWCG_REPORTING_AGENCY", nullable=True)
+
+    fire_count = Column(Integer, nullable=False)
+    fire_size_sum = Column(Float, nullable=True)
+    fire_size_count = Column(Integer, nullable=False) # So averages skip missing sizes, just like AVG() does.
+    duration_sum = Column(Float, nullable=True)
+    duration_count = Column(Integer, nullable=False)
+    located_count = Column(Integer, nullable=False) # Fires with a latitude, longitude and size, i.e. the ones the map can show.
+
+    __table_args__ = (
+        Index("ix_wildfire_rollup_date", DISCOVERY_DATE),
+        Index("ix_wildfire_rollup_state_date", STATE, DISCOVERY_DATE),
+        Index("ix_wildfire_rollup_cause_date", STAT_CAUSE_DESCR, DISCOVERY_DATE),
+    )
+
+# Running totals per day, built by the ETL from the rollup: for every state, cause and
+# state + cause (a NULL state or cause means "any"), how many fires and acres there have
+# been from the first day on record up to and including DISCOVERY_DATE. A cumulative total
+# up to some date is then one index lookup instead of a scan of every fire before it.
+class CumulativeTotal(Base):
+    __tablename__ = "wildfire_cumulative_totals"
+
+    id = Column(Integer, primary_key=True)
+    STATE = Column(Categorical("STATE"), name="STATE", nullable=True)
+    STAT_CAUSE_DESCR = Column(Categorical("STAT_CAUSE_DESCR"), name="STAT_CAUSE_DESCR", nullable=True)
+    DISCOVERY_DATE = Column(Date, name="DISCOVERY_DATE", nullable=False)
+
+    cumulative_count = Column(BigInteger, nullable=False)
+    cumulative_acres = Column(Float, nullable=False)
+    # This day on its own, and just its fires discovered at exactly midnight. The API's date
+    # filters only take the midnight fires of the end date, so the lookup needs those too.
+    day_count = Column(Integer, nullable=False)
+    day_acres = Column(Float, nullable=False)
+    midnight_count = Column(Integer, nullable=False)
+    midnight_acres = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index("ix_wildfire_cumulative_totals_lookup", STATE, STAT_CAUSE_DESCR, DISCOVERY_DATE),
+    )
+
+# Per map-grid cell totals for the clustered map, built by the ETL: for every cell at the
+# coarser grid zooms (see CELL_ROLLUP_ZOOMS in app/etl/rollups.py), how many located fires
+# of each state, cause and FIRE_YEAR it holds, with the sums needed for their centroid and
+# acres. A cluster request at national zoom then reads a few rows per visible cell instead
+# of grouping every fire. DATED is False for the fires without a discovery date, which the
+# date filters leave out.
+class CellRollup(Base):
+    __tablename__ = "wildfire_cell_rollup"
+
+    id = Column(Integer, primary_key=True)
+    zoom = Column(SmallInteger, nullable=False)
+    cell = Column(BigInteger, nullable=False)
+    STATE = Column(Categorical("STATE"), name="STATE", nullable=True)
+    STAT_CAUSE_DESCR = Column(Categorical("STAT_CAUSE_DESCR"), name="STAT_CAUSE_DESCR", nullable=True)
+    FIRE_YEAR = Column(Integer, name="FIRE_YEAR", nullable=False)
+    DATED = Column(Boolean, name="DATED", nullable=False)
+
+    fire_count = Column(Integer, nullable=False)
+    latitude_sum = Column(Float, nullable=False)
+    longitude_sum = Column(Float, nullable=False)
+    fire_size_sum = Column(Float, nullable=True)
+
+    __table_args__ = (
+        Index("ix_wildfire_cell_rollup_cell", zoom, cell),
+        Index("ix_wildfire_cell_rollup_state_cell", zoom, STATE, cell),
+        Index("ix_wildfire_cell_rollup_cause_cell", zoom, STAT_CAUSE_DESCR, cell),
+    )
+
+# Pre-built animation frames: every fire of a year (the same ones /fires/year returns) in
+# discovery order, packed in the binary layout from app/packing.py. The ETL builds one
+# per year for every state, every cause and every state + cause, so the animation can
+# fetch a whole range of years without the API touching the 'wildfires' table.
+# A NULL state or cause means the frame isn't filtered on it.
+class AnimationFrame(Base):
+    __tablename__ = "animation_frames"
+
+    id = Column(Integer, primary_key=True)
+    FIRE_YEAR = Column(Integer, name="FIRE_YEAR", nullable=False)
+    STATE = Column(Categorical("STATE"), name="STATE", nullable=True)
+    STAT_CAUSE_DESCR = Column(Categorical("STAT_CAUSE_DESCR"), name="STAT_CAUSE_DESCR", nullable=True)
+    fire_count = Column(Integer, nullable=False)
+    frame = Column(LargeBinary, nullable=False)
+
+    __table_args__ = (
+        Index("ix_animation_frames_lookup", STATE, STAT_CAUSE_DESCR, FIRE_YEAR),
+    )
@@ -29,13 +29,30 @@ class FirePoint(BaseModel):
 # which is useful for the main map so we don't load all fires at once.
 class PaginatedFiresResponse(BaseModel):
     total_fires: int
-    page: int
+    page: Optional[int] = None # None for pages fetched with a cursor.
     limit: int
     fires: List[FirePoint]
+    next_cursor: Optional[str] = None # Pass this back as `cursor` to get the next page.
 
     class Config:
         orm_mode = True
 
+# One marker on the clustered map: either a group of nearby fires, or a single fire
+# once the map is zoomed in far enough (then count is 1 and fod_id is set).
+class FireCluster(BaseModel):
+    lat: float
+    lon: float
+    count: int
+    total_acres: float
+    dominant_cause: Optional[str] = None
+    fod_id: Optional[int] = None
+
+# All the markers for one map viewport.
+class FireClusterResponse(BaseModel):
+    zoom: int
+    grid_zoom: Optional[int] = None # The grid level the fires were grouped at, None for single fires.
+    clusters: List[FireCluster]
+
 # --- Schemas for Charts and Summaries ---
 
 # For the main summary cards showing total incidents and acres burned.
@@ -110,6 +127,13 @@ class DurationDistribution(BaseModel):
     class Config:
         orm_mode = True
 
+# One bin of a histogram: the fires with lower <= value < upper. The upper edge of an
+# open-ended last bin is None.
+class HistogramBin(BaseModel):
+    lower: float
+    upper: Optional[float] = None
+    count: int
+
 # Used for the chart that breaks down fire counts by size and cause.
 class SizeClassByCause(BaseModel):
     size_class: str
@@ -163,3 +187,9 @@ class MonthlyFireFrequency(BaseModel):
 
     class Config:
         orm_mode = True
+
+# One point of a time series: the fires discovered in the period starting on `period`.
+class TimeSeriesPoint(BaseModel):
+    period: date
+    fire_count: int
+    total_acres: float
@@ -0,0 +1,36 @@
+# backend/app/sampling.py
+import numpy as np
+
+# Reproducible random samples without ORDER BY random(). Every fire gets a SAMPLE_KEY when
+# it's loaded: a hash of its FOD_ID, so the keys are spread evenly over [0, 2^31) and have
+# nothing to do with where, when or why the fire happened. Sorting by the key is therefore
+# a random shuffle of the table that never changes between requests.
+#
+# A seed picks where in that shuffle a sample starts: the sample is the first N fires with
+# a key at or after the seed's start point, wrapping around past the largest key. The same
+# seed and filters always give the same sample, and a different seed gives a different one.
+
+SAMPLE_KEY_BITS = 31
+SAMPLE_KEY_SPACE = 2 ** SAMPLE_KEY_BITS
+
+# The biggest seed the API takes, so it fits a signed 64-bit integer like the rest of the query parameters.
+MAX_SEED = 2 ** 63 - 1
+
+def _mix(values):
+    # SplitMix64's finalizer: a cheap, well-spread 64-bit hash. The uint64 arithmetic wraps.
+    z = np.asarray(values).astype("uint64") + np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    z = z ^ (z >> np.uint64(31))
+    return z >> np.uint64(64 - SAMPLE_KEY_BITS)
+
+def sample_keys(fod_ids):
+    """The SAMPLE_KEY of each FOD_ID, as an int64 array of values in [0, 2^31)."""
+    with np.errstate(over="ignore"):
+        return _mix(fod_ids).astype("int64")
+
+def seed_start(seed):
+    """Where in the key space the sample for this seed begins."""
+    # Offset from the FOD_ID hashes, so seed N doesn't start right at the fire with FOD_ID N.
+    # The hash works on 64-bit integers, so any bigger seed is wrapped around into that range.
+    return int(sample_keys([(seed ^ 0x5EED) % 2 ** 64])[0])
@@ -1,7 +1,6 @@
-import pandas as pd
-import sqlite3
-from sqlalchemy import create_engine
-import numpy as np
+from sqlalchemy import create_engine, text
+from functools import partial
+import argparse
 import time
 import os
 import sys
@@ -11,8 +10,18 @@ import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'backend')))
 from app.database import Base
 from app.models import db_models
-
-print("--- Kicking off the data engineering and loading pipeline ---")
+from app.etl.extract import load_nwcg, read_fire_chunks
+from app.etl.transform import transform_chunk
+from app.etl.loaders import UPSERT_LOADERS, copy_chunk, pick_loader
+from app.etl.pipeline import PipelineStats, run_pipeline
+from app.etl import state as etl_state
+from app.etl.indexes import create_secondary_indexes, drop_secondary_indexes
+from app.etl.rollups import rebuild_cell_rollup, rebuild_cumulative_totals, rebuild_rollup
+from app.etl.frames import rebuild_animation_frames
+from app.etl import partitions
+from app import dataset
+from app.etl.categories import source_labels, sync_codebook
+from app.models.categories import CATEGORICAL_COLUMNS
 
 # --- Configuration ---
 # Here we set up all the important paths and credentials.
@@ -23,120 +32,291 @@ DB_HOST = "db"
 DB_PORT = "5432"
 DB_NAME = "wildfiredb"
 
-# A quick check to make sure the original SQLite database actually exists.
-if not os.path.exists(SQLITE_PATH):
-    print(f"FATAL: Can't find the SQLite database at {SQLITE_PATH}")
-    exit()
+# We'll process the data in chunks to avoid running out of memory.
+CHUNK_SIZE = 50000
+
+# Every table this script creates or fills in.
+ETL_TABLES = [
+    db_models.Wildfire.__table__, db_models.EtlState.__table__,
+    db_models.WildfireRollup.__table__, db_models.CategoryLabel.__table__,
+    db_models.CumulativeTotal.__table__, db_models.AnimationFrame.__table__,
+    db_models.DatasetVersion.__table__, db_models.CellRollup.__table__
+]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load the FPA FOD wildfire data into PostgreSQL.")
+    parser.add_argument(
+        "--loader", choices=["auto", "copy", "insert"], default="auto",
+        help="How chunks are written: 'copy' streams them with COPY FROM STDIN (PostgreSQL only), "
+             "'insert' uses the original executemany path. 'auto' picks COPY when it can."
+    )
+    parser.add_argument(
+        "--workers", type=int, default=0,
+        help="Number of transform processes. 0 runs everything in one loop, like before; "
+             "1 or more turns on the pipelined mode."
+    )
+    parser.add_argument(
+        "--loaders", type=int, default=1,
+        help="Number of database connections writing chunks in pipelined mode."
+    )
+    parser.add_argument(
+        "--queue-depth", type=int, default=4,
+        help="How many transformed chunks can wait for a loader before the reader pauses."
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--incremental", action="store_true",
+        help="Keep the existing table and only upsert new or changed rows, resuming from the "
+             "last checkpoint if a previous run was interrupted."
+    )
+    mode.add_argument(
+        "--reload-year", type=int, default=None, metavar="YEAR",
+        help="Reload just one FIRE_YEAR into a staging table and swap it in for that year's partition."
+    )
+    return parser.parse_args()
 
-# Building the connection string for our PostgreSQL database.
-db_url = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-engine = create_engine(db_url)
+def run_serial(chunks, nwcg, codes, engine, load_chunk, on_loaded=None):
+    """The original one-step-after-another loop, with the same stats as the pipeline."""
+    stats = PipelineStats()
+    table = db_models.Wildfire.__table__
+    iterator = iter(chunks)
+    i = 0
+    while True:
+        stage_start = time.perf_counter()
+        chunk = next(iterator, None)
+        if chunk is None:
+            break
+        stats.add("read", time.perf_counter() - stage_start, rows_read=len(chunk))
+        i += 1
+        print(f"   Processing chunk {i}...")
 
-# --- Drop and Recreate Table ---
-# To ensure we have a fresh start, we'll completely wipe and rebuild the 'wildfires' table.
-print("Step 1: Dropping and recreating the 'wildfires' table...")
-try:
+        # All the cleaning and feature engineering lives in app/etl/transform.py.
+        stage_start = time.perf_counter()
+        chunk_final = transform_chunk(chunk, nwcg, codes)
+        stats.add("transform", time.perf_counter() - stage_start)
+
+        # Time to load this chunk into our PostgreSQL database.
+        stage_start = time.perf_counter()
+        with engine.begin() as conn:
+            rows = load_chunk(conn, table, chunk_final)
+        stats.add("load", time.perf_counter() - stage_start, rows_loaded=rows, chunks_loaded=1)
+        if on_loaded:
+            on_loaded(i, chunk_final)
+    return stats
+
+def recreate_tables(engine, signature):
+    """The full-reload path: wipe the 'wildfires' table and start from scratch."""
+    # To ensure we have a fresh start, we'll completely wipe and rebuild the 'wildfires' table.
+    print("Step 1: Dropping and recreating the 'wildfires' table...")
     with engine.begin() as conn:
-        Base.metadata.drop_all(conn, tables=[db_models.Wildfire.__table__])
-        Base.metadata.create_all(conn, tables=[db_models.Wildfire.__table__])
-    print(" Table schema created successfully.")
-except Exception as e:
-    print(f" ERROR creating table: {e}")
-    exit()
-
-# --- ETL (Extract, Transform, Load) ---
-# Now for the main event: moving and cleaning the data.
-print("Step 2: Loading the NWCG agency lookup table...")
-sqlite_conn = sqlite3.connect(SQLITE_PATH)
-nwcg = pd.read_sql_query(
-    "SELECT UnitId, GeographicArea, UnitType, Agency, Name FROM NWCG_UnitIDActive_20170109",
-    sqlite_conn
-)
-
-# This is the query to pull all the fire data we need from the original SQLite database.
-fires_query = """
-SELECT 
-    FOD_ID, FIRE_NAME, FIRE_YEAR, STAT_CAUSE_DESCR, LATITUDE, LONGITUDE, STATE, 
-    OWNER_DESCR, OWNER_CODE, FIRE_SIZE, FIRE_SIZE_CLASS, DISCOVERY_DOY, 
-    DISCOVERY_DATE, DISCOVERY_TIME, CONT_DATE, CONT_TIME,
-    NWCG_REPORTING_AGENCY, NWCG_REPORTING_UNIT_ID, COMPLEX_NAME,
-    COUNTY, FIPS_CODE, FIPS_NAME
-FROM Fires
-"""
+        # The rollup gets rebuilt from scratch at the end anyway, so it's recreated too in case its columns changed.
+        Base.metadata.drop_all(conn, tables=[
+            db_models.Wildfire.__table__, db_models.WildfireRollup.__table__,
+            db_models.CumulativeTotal.__table__, db_models.AnimationFrame.__table__,
+            db_models.CellRollup.__table__
+        ])
+        Base.metadata.create_all(conn, tables=ETL_TABLES)
+        partitions.create_year_partitions(conn, db_models.Wildfire.__table__, partitions.source_years(SQLITE_PATH))
+        # The secondary indexes get built after the load, which is much faster than maintaining them row by row.
+        drop_secondary_indexes(conn, db_models.Wildfire.__table__)
+        etl_state.start_pass(conn, signature)
+    print(" Table schema created successfully (secondary indexes deferred until after the load).")
 
-# We'll process the data in chunks to avoid running out of memory.
-chunk_size = 50000
-start_time = time.time()
-print("Step 3: Processing and loading the fires data in chunks...")
-
-# A helper function to clean up the time values, which can be a bit messy.
-def clean_time(val):
-    val_str = str(val).split('.')[0].zfill(4)
-    if val_str.isdigit() and len(val_str) == 4:
-        hour = int(val_str[:2])
-        minute = int(val_str[2:])
-        if 0 <= hour <= 23 and 0 <= minute <= 59:
-            return f"{hour:02d}:{minute:02d}"
-    return "00:00" # If the time is invalid, we'll just default to midnight.
-
-total_rows = 0
-for i, chunk in enumerate(pd.read_sql_query(fires_query, sqlite_conn, chunksize=chunk_size)):
-    print(f"   Processing chunk {i+1}...")
-
-    # We'll merge the fire data with our agency lookup table.
-    chunk = chunk.merge(nwcg, left_on='NWCG_REPORTING_UNIT_ID', right_on='UnitId', how='left')
-
-    # --- Cleaning up the date and time columns ---
-    chunk['DISCOVERY_TIME_FORMATTED'] = chunk['DISCOVERY_TIME'].fillna('0000').apply(clean_time)
-    chunk['CONT_TIME_FORMATTED'] = chunk['CONT_TIME'].fillna('0000').apply(clean_time)
-
-    # The original dates are in a Julian format, so we convert them to standard datetimes.
-    chunk['DISCOVERY_DATETIME'] = pd.to_datetime(chunk['DISCOVERY_DATE'], origin='julian', unit='D', errors='coerce')
-    chunk['CONT_DATETIME'] = pd.to_datetime(chunk['CONT_DATE'], origin='julian', unit='D', errors='coerce')
-
-    # These functions safely combine the date and time parts into a single datetime object.
-    def safe_combine_discovery(row):
-        if pd.isna(row['DISCOVERY_DATETIME']): return pd.NaT
-        try: return pd.to_datetime(f"{row['DISCOVERY_DATETIME'].date()} {row['DISCOVERY_TIME_FORMATTED']}")
-        except (ValueError, TypeError): return pd.NaT
-
-    def safe_combine_containment(row):
-        if pd.isna(row['CONT_DATETIME']): return pd.NaT
-        try: return pd.to_datetime(f"{row['CONT_DATETIME'].date()} {row['CONT_TIME_FORMATTED']}")
-        except (ValueError, TypeError): return pd.NaT
-
-    chunk['DISCOVERY_DATETIME'] = chunk.apply(safe_combine_discovery, axis=1)
-    chunk['CONT_DATETIME'] = chunk.apply(safe_combine_containment, axis=1)
-    
-    # --- Feature Engineering ---
-    # Now we can create some new, useful columns from the cleaned data.
-    chunk['FIRE_DURATION_DAYS'] = ((chunk['CONT_DATETIME'] - chunk['DISCOVERY_DATETIME']).dt.total_seconds() / (24 * 60 * 60))
-    chunk['DISCOVERY_MONTH'] = chunk['DISCOVERY_DATETIME'].dt.month
-    chunk['DISCOVERY_DAY_OF_WEEK'] = chunk['DISCOVERY_DATETIME'].dt.day_name()
-    chunk['DISCOVERY_HOUR'] = chunk['DISCOVERY_DATETIME'].dt.hour
-
-    # --- Final Column Selection ---
-    # We'll select only the columns we actually need for our final database table.
-    final_columns = [
-        'FOD_ID', 'FIRE_NAME', 'FIRE_YEAR', 'STAT_CAUSE_DESCR', 'LATITUDE', 'LONGITUDE',
-        'STATE', 'OWNER_DESCR', 'OWNER_CODE', 'FIRE_SIZE', 'FIRE_SIZE_CLASS',
-        'COMPLEX_NAME', 'DISCOVERY_DOY', 'NWCG_REPORTING_AGENCY', 'NWCG_REPORTING_UNIT_ID',
-        'GeographicArea', 'UnitType', 'Agency', 'Name', 'COUNTY', 'FIPS_CODE', 'FIPS_NAME',
-        'DISCOVERY_DATETIME', 'CONT_DATETIME', 'DISCOVERY_MONTH',
-        'DISCOVERY_DAY_OF_WEEK', 'DISCOVERY_HOUR', 'FIRE_DURATION_DAYS'
-    ]
-    chunk_final = chunk[final_columns]
-
-    # Pandas uses NaN for missing values, but our database prefers None (or NULL).
-    chunk_final = chunk_final.replace({pd.NaT: None, np.nan: None})
-
-    # Time to load this chunk into our PostgreSQL database.
+def add_missing_columns(conn, table):
+    """Adds any column the model has but the existing table doesn't. They all start out NULL."""
+    for column in table.columns:
+        column_type = column.type.compile(dialect=conn.dialect)
+        conn.execute(text(
+            f'ALTER TABLE {table.name} ADD COLUMN IF NOT EXISTS "{column.name}" {column_type}'
+        ))
+
+def text_category_columns(conn, table):
+    """The categorical columns that are still plain text in the database instead of SMALLINT codes."""
+    rows = conn.execute(
+        text("SELECT column_name, data_type FROM information_schema.columns WHERE table_name = :table"),
+        {"table": table.name}
+    )
+    return [name for name, data_type in rows if name in CATEGORICAL_COLUMNS and data_type != "smallint"]
+
+def prepare_incremental(engine, signature):
+    """
+    The incremental path: keep the table, and work out where to start from.
+    Returns (should_run, FOD_ID to resume after).
+    """
+    print("Step 1: Checking the 'wildfires' table and the ETL checkpoint...")
+    with engine.begin() as conn:
+        Base.metadata.create_all(conn, tables=ETL_TABLES)
+        # Tables created by an older version of this script won't have the newer columns yet
+        # (ROW_HASH, the grid cells, ...). They get filled in as the rows are rewritten.
+        add_missing_columns(conn, db_models.Wildfire.__table__)
+        add_missing_columns(conn, db_models.WildfireRollup.__table__)
+        stale = text_category_columns(conn, db_models.Wildfire.__table__) + \
+            text_category_columns(conn, db_models.WildfireRollup.__table__)
+        if stale:
+            raise RuntimeError(
+                f"{', '.join(sorted(set(stale)))} still hold text from an older version of this script. "
+                "Run one full load (without --incremental) to switch them to category codes."
+            )
+        # New years in the source need their partitions before we can load them.
+        partitions.create_year_partitions(conn, db_models.Wildfire.__table__, partitions.source_years(SQLITE_PATH))
+
+        saved = etl_state.get_state(conn)
+        if saved is not None and saved.source_signature == signature:
+            if saved.status == "complete":
+                print(" The source hasn't changed since the last complete load. Nothing to do.")
+                return False, None
+            print(f" Resuming an interrupted load after FOD_ID {saved.last_fod_id} "
+                  f"({saved.chunks_committed} chunks already committed).")
+            return True, saved.last_fod_id
+
+        # Either this is the first run, or the source or TRANSFORM_VERSION changed, so we go
+        # through everything again. Unchanged rows are skipped by their hash when we get to them.
+        etl_state.start_pass(conn, signature)
+        print(" Starting a new incremental pass over the source.")
+    return True, None
+
+def prepare_year_reload(engine, year):
+    """The single-year path: load into a staging table now, swap it in at the end."""
+    print(f"Step 1: Creating a staging partition for FIRE_YEAR {year}...")
     with engine.begin() as conn:
-        if not chunk_final.empty:
-            conn.execute(db_models.Wildfire.__table__.insert(), chunk_final.to_dict(orient='records'))
+        Base.metadata.create_all(conn, tables=ETL_TABLES)
+        staging = partitions.create_staging_partition(conn, db_models.Wildfire.__table__, year)
+    print(f" Staging table '{staging}' created. The live data stays untouched until the swap.")
+    return staging
+
+def main():
+    args = parse_args()
+    print("--- Kicking off the data engineering and loading pipeline ---")
+
+    # A quick check to make sure the original SQLite database actually exists.
+    if not os.path.exists(SQLITE_PATH):
+        print(f"FATAL: Can't find the SQLite database at {SQLITE_PATH}")
+        exit()
+
+    # Building the connection string for our PostgreSQL database.
+    db_url = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    # Each loader thread holds its own connection, so the pool needs to be at least that big.
+    engine = create_engine(db_url, pool_size=max(5, args.loaders))
+    loader_name, load_chunk = pick_loader(engine, args.loader)
+    signature = etl_state.source_signature(SQLITE_PATH)
+    resume_after = None
+    on_loaded = None
+
+    # --- Prepare the Table ---
+    staging = None
+    try:
+        if args.reload_year is not None:
+            if engine.dialect.name != "postgresql":
+                print("FATAL: Reloading a single year swaps PostgreSQL partitions, so it needs PostgreSQL.")
+                exit()
+            staging = prepare_year_reload(engine, args.reload_year)
+            loader_name, load_chunk = "copy", partial(copy_chunk, target=staging)
+        elif args.incremental:
+            if engine.dialect.name != "postgresql":
+                print("FATAL: The incremental mode relies on ON CONFLICT and only works with PostgreSQL.")
+                exit()
+            should_run, resume_after = prepare_incremental(engine, signature)
+            if not should_run:
+                return
+            load_chunk = UPSERT_LOADERS[loader_name]
+            on_loaded = etl_state.CheckpointTracker(engine).chunk_loaded
+        else:
+            recreate_tables(engine, signature)
+    except Exception as e:
+        print(f" ERROR preparing table: {e}")
+        exit()
+
+    # --- ETL (Extract, Transform, Load) ---
+    # Now for the main event: moving and cleaning the data.
+    print("Step 2: Loading the NWCG agency lookup table and the category codes...")
+    nwcg = load_nwcg(SQLITE_PATH)
+    # Every label in the source gets its code before the load starts, so the
+    # transform workers can all encode their chunks the same way.
+    with engine.begin() as conn:
+        codes = sync_codebook(conn, source_labels(SQLITE_PATH))
+    print(f" {sum(len(mapping) for mapping in codes.values())} category labels across {len(codes)} columns.")
+
+    start_time = time.time()
+    print("Step 3: Processing and loading the fires data in chunks...")
+    chunks = read_fire_chunks(
+        SQLITE_PATH, CHUNK_SIZE, after_fod_id=resume_after,
+        order_by="FOD_ID" if args.incremental else "DISCOVERY_DATE",
+        fire_year=args.reload_year
+    )
+
+    if args.workers > 0:
+        print(f"   Pipelined mode: {args.workers} transform workers, {args.loaders} loader(s), "
+              f"queue depth {args.queue_depth}, '{loader_name}' loader.")
+        stats = run_pipeline(
+            chunks, nwcg, codes, engine, db_models.Wildfire.__table__, load_chunk,
+            workers=args.workers, loaders=args.loaders, queue_depth=args.queue_depth, on_loaded=on_loaded
+        )
+    else:
+        print(f"   Serial mode, '{loader_name}' loader.")
+        stats = run_serial(chunks, nwcg, codes, engine, load_chunk, on_loaded=on_loaded)
+
+    if staging:
+        # The staging table gets its indexes first, so the swap itself is just a quick catalog change.
+        print(f"Step 4: Indexing '{staging}' and swapping it in for FIRE_YEAR {args.reload_year}...")
+        with engine.begin() as conn:
+            partitions.index_staging_partition(conn, db_models.Wildfire.__table__, staging, args.reload_year)
+        with engine.begin() as conn:
+            partitions.swap_year_partition(conn, db_models.Wildfire.__table__, args.reload_year, staging)
+        print(" Partition swapped.")
+    else:
+        # Indexes that already exist are skipped, so after an incremental run this is just the ANALYZE.
+        # It also means a crashed full load gets its indexes back on the next run, whichever mode it is.
+        print("Step 4: Building the secondary indexes...")
+        with engine.begin() as conn:
+            index_seconds = create_secondary_indexes(conn, db_models.Wildfire.__table__)
+        print(f" Indexes ready in {index_seconds:.2f} seconds.")
+
+    # The dashboard reads most of its charts from this pre-aggregated table.
+    # The running totals are built from the rollup, so they're always in step with it.
+    # The clustered map reads its coarse zooms from the per-cell totals.
+    print("Step 5: Rebuilding the 'wildfire_rollup', 'wildfire_cumulative_totals' and 'wildfire_cell_rollup' tables...")
+    with engine.begin() as conn:
+        rollup_rows, rollup_seconds = rebuild_rollup(conn)
+        cumulative_rows, cumulative_seconds = rebuild_cumulative_totals(conn)
+        cell_rows, cell_seconds = rebuild_cell_rollup(conn)
+    print(f" Rollup ready: {rollup_rows} rows in {rollup_seconds:.2f} seconds.")
+    print(f" Running totals ready: {cumulative_rows} rows in {cumulative_seconds:.2f} seconds.")
+    print(f" Cell totals ready: {cell_rows} rows in {cell_seconds:.2f} seconds.")
+
+    # The animation reads whole years from pre-built frames. A single-year reload only
+    # changed that one year, so that's the only one we rebuild.
+    print("Step 6: Rebuilding the 'animation_frames' table...")
+    with engine.begin() as conn:
+        frame_count, frame_bytes, frame_seconds = rebuild_animation_frames(
+            conn, years=[args.reload_year] if staging else None
+        )
+    print(f" Frames ready: {frame_count} frames ({frame_bytes / 1e6:.1f} MB) in {frame_seconds:.2f} seconds.")
+
+    # A new version tells the running API that everything it cached is out of date.
+    with engine.begin() as conn:
+        version = dataset.publish_version(conn)
+    print(f" Published dataset version {version}.")
+
+    # Everything made it in, so the next incremental run knows it can skip an unchanged source.
+    # A single-year reload isn't a full pass, so it leaves the checkpoint alone.
+    if not staging:
+        with engine.begin() as conn:
+            etl_state.finish_pass(conn)
+
+    end_time = time.time()
+    total_rows = stats.rows_read
+    print(f" Data load complete. Read {stats.rows_read} rows and wrote {stats.rows_loaded} "
+          f"in {end_time - start_time:.2f} seconds.")
+
+    # A quick breakdown of where the time went. In pipelined mode the stages overlap,
+    # so these are busy times summed over every thread/process working on that stage.
+    def rows_per_second(seconds):
+        return f"{total_rows / seconds:,.0f} rows/s" if seconds > 0 else "n/a"
 
-    total_rows += len(chunk_final)
+    print(f"   Read stage: {stats.seconds['read']:.2f} s ({rows_per_second(stats.seconds['read'])})")
+    print(f"   Transform stage: {stats.seconds['transform']:.2f} s ({rows_per_second(stats.seconds['transform'])})")
+    print(f"   Load stage ('{loader_name}'): {stats.seconds['load']:.2f} s ({rows_per_second(stats.seconds['load'])})")
+    print(f"   Overall: {rows_per_second(end_time - start_time)}")
 
-sqlite_conn.close()
-end_time = time.time()
-print(f" Data load complete. Inserted {total_rows} rows in {end_time - start_time:.2f} seconds.")
+if __name__ == "__main__":
+    main()